@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Timing check of the --analyse mode of full_export_csv_v5.py on large single vdom configs (see
+# generate_config.py): one with the generated sources, one where most policies have srcaddr "all", and both again
+# with every policy on the same interface pair, where all the policies of the vdom are compared with each other.
+# Exits with code 1 when a config takes longer than the limit.
+
+import os
+import os.path
+import subprocess
+import sys, getopt, time
+
+from generate_config import counts as generator_counts, generate
+
+BENCH_FOLDER = os.path.dirname(os.path.abspath(__file__))
+REPO_FOLDER = os.path.dirname(BENCH_FOLDER)
+
+# name: generator options on top of generate_config.counts, single vdom
+CASES = {
+    'generated': {},
+    'all-sources': {'all_sources': 90},
+}
+
+policies = 20000
+limit = 30.0    # seconds allowed for each config
+seed = 1
+work_dir = os.path.join(BENCH_FOLDER, 'work')
+
+
+def usage():
+    """ Used to print Syntax
+    """
+    print("Syntax:\n\t{} [--policies <n>] [--limit <seconds>] [--seed <n>] [--work <folder>]".format(
+        os.path.basename(__file__)))
+    print("Examples:\n\t{} --policies 20000 --limit 30".format(os.path.basename(__file__)))
+
+
+def main(argv):
+    global policies, limit, seed, work_dir
+    try:
+        opts, args = getopt.getopt(argv, "h", ["policies=", "limit=", "seed=", "work="])
+    except getopt.GetoptError:
+        print("Error:\n\tInvalid commands")
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("--policies", "--seed"):
+            if not arg.isdigit() or (opt == "--policies" and int(arg) < 1):
+                print("Error:\n\tInvalid value {} for {}".format(arg, opt))
+                usage()
+                sys.exit(2)
+            if opt == "--policies":
+                policies = int(arg)
+            else:
+                seed = int(arg)
+        elif opt == "--limit":
+            try:
+                limit = float(arg)
+            except ValueError:
+                print("Error:\n\tInvalid value {} for {}".format(arg, opt))
+                usage()
+                sys.exit(2)
+        elif opt == "--work":
+            work_dir = arg
+
+
+def config_files(name: str, options: dict) -> list:
+    """ Generated config of the case and the same config with one interface pair, made once and reused.
+    """
+    path = os.path.join(work_dir, 'analyse-{}-{}-seed{}.conf'.format(name, policies, seed))
+    one_pair = path[:-len('.conf')] + '-one-pair.conf'
+    if not os.path.isfile(path):
+        generator_options = dict(generator_counts, seed=seed, policies=policies, **options)
+        del generator_options['vdoms']
+        print("Generating {}".format(path))
+        generate(path, 1, **generator_options)
+    if not os.path.isfile(one_pair):
+        with open(path) as config, open(one_pair, 'w') as out:
+            for line in config:
+                if line.startswith(('        set srcintf ', '        set dstintf ')):
+                    line = line[:line.index('"')] + '"port1"\n'
+                out.write(line)
+    return [path, one_pair]
+
+
+def run_analysis(backup_file: str) -> tuple:
+    """
+    Returns:
+        seconds (float): wall time of the process.
+        summary (str): Results line printed by the script.
+    """
+    output_file = backup_file[:-len('.conf')] + '-findings.csv'
+    command = [sys.executable, os.path.join(REPO_FOLDER, 'full_export_csv_v5.py'), '-i', backup_file, '--analyse',
+               '-o', output_file]
+    started = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True)
+    seconds = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError('{} failed with exit code {}'.format(' '.join(command), process.returncode))
+    lines = [line for line in process.stdout.splitlines() if line.startswith('Results:')]
+    return seconds, lines[-1] if lines else ''
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
+    os.makedirs(work_dir, exist_ok=True)
+    backup_files = [backup_file for name, options in CASES.items() for backup_file in config_files(name, options)]
+    failed = 0
+    print('{:<45}  {:>8}  {}'.format('config', 'seconds', 'findings'))
+    for backup_file in backup_files:
+        seconds, summary = run_analysis(backup_file)
+        status = '' if seconds <= limit else '  over the limit of {:g} seconds'.format(limit)
+        failed += bool(status)
+        print('{:<45}  {:>8.2f}  {}{}'.format(os.path.basename(backup_file), seconds,
+                                             summary[len('Results: '):].split(' exported')[0], status))
+    print("Results: {} configs of {} policies, {} over {:g} seconds".format(len(backup_files), policies, failed,
+                                                                           limit))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,377 @@
+#!/usr/bin/python
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Synthetic FortiGate backup config for the benchmarks.
+# Each vdom gets address (subnet, host, range, fqdn, geography, wildcard), nested addrgrp, vip, vipgrp,
+# service custom/group and policy tables laid out like a FortiOS 6.4 backup. The same options and seed always
+# give the same file. Lines are written as they are made, so a 1 GB config does not need 1 GB of memory.
+
+import os.path
+import random
+import sys, getopt
+
+# objects of each vdom, --<name> <n> on the command line
+counts = {
+    'vdoms': 3,
+    'addresses': 200,
+    'addrgrps': 40,
+    'depth': 3,     # levels of nested address groups
+    'vips': 20,
+    'vipgrps': 4,
+    'services': 30,
+    'policies': 500,
+    'all_sources': 0,   # percent of the policies with srcaddr "all"
+    'seed': 1,
+}
+size_mb = None  # target size, scales the vdom count, or the policies when the vdom count is given
+vdoms_given = False
+output_file = 'bench-config.conf'
+
+STANDARD_SERVICES = [
+    ('ALL', ['set protocol IP']),
+    ('ALL_TCP', ['set tcp-portrange 1-65535']),
+    ('ALL_UDP', ['set udp-portrange 1-65535']),
+    ('ALL_ICMP', ['set protocol ICMP', 'unset icmptype']),
+    ('PING', ['set protocol ICMP', 'set icmptype 8', 'unset icmpcode']),
+    ('GRE', ['set protocol IP', 'set protocol-number 47']),
+    ('HTTP', ['set tcp-portrange 80']),
+    ('HTTPS', ['set tcp-portrange 443']),
+    ('DNS', ['set tcp-portrange 53', 'set udp-portrange 53']),
+    ('SSH', ['set tcp-portrange 22']),
+    ('NTP', ['set tcp-portrange 123', 'set udp-portrange 123']),
+    ('SNMP', ['set tcp-portrange 161-162', 'set udp-portrange 161-162']),
+    ('webproxy', ['set proxy enable', 'set protocol ALL', 'set tcp-portrange 0-65535:0-65535']),
+]
+
+
+def usage():
+    """ Used to print Syntax
+    """
+    print("Syntax:\n\t{} -o <outputfile> [--size <MB>] [--vdoms <n>] [--addresses <n>] [--addrgrps <n>] [--depth <n>] "
+          "[--vips <n>] [--vipgrps <n>] [--services <n>] [--policies <n>] [--all_sources <percent>] [--seed <n>]".format(os.path.basename(__file__)))
+    print("Examples:\n\t{} -o bench-10mb.conf --size 10".format(os.path.basename(__file__)))
+    print("\t{} -o single-vdom.conf --vdoms 1 --policies 20000".format(os.path.basename(__file__)))
+    print("\t{} -o outbound.conf --vdoms 1 --policies 20000 --all_sources 100".format(os.path.basename(__file__)))
+
+
+def main(argv):
+    global size_mb
+    global vdoms_given
+    global output_file
+    try:
+        opts, args = getopt.getopt(argv, "ho:", ["ofile=", "size="] + [name + '=' for name in counts])
+    except getopt.GetoptError:
+        print("Error:\n\tInvalid commands")
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("-o", "--ofile"):
+            output_file = arg
+        else:
+            try:
+                value = float(arg) if opt == "--size" else int(arg)
+            except ValueError:
+                value = -1
+            if value < (1 if opt in ("--size", "--vdoms", "--depth") else 0):
+                print("Error:\n\tInvalid value {} for {}".format(arg, opt))
+                usage()
+                sys.exit(2)
+            if opt == "--size":
+                size_mb = value
+            else:
+                counts[opt[2:]] = value
+                vdoms_given = vdoms_given or opt == "--vdoms"
+
+
+class ConfigGenerator:
+    """ Writes the synthetic backup, every random choice comes from one seeded generator.
+    """
+
+    def __init__(self, seed: int, addresses: int, addrgrps: int, depth: int, vips: int, vipgrps: int,
+                 services: int, policies: int, all_sources: int = 0):
+        self.random = random.Random(seed)
+        self.addresses = addresses
+        self.addrgrps = addrgrps
+        self.depth = depth
+        self.vips = vips
+        self.vipgrps = vipgrps
+        self.services = services
+        self.policies = policies
+        self.all_sources = all_sources
+
+    def uuid(self) -> str:
+        bits = '{:032x}'.format(self.random.getrandbits(128))
+        return '-'.join((bits[:8], bits[8:12], bits[12:16], bits[16:20], bits[20:]))
+
+    def write_header(self, out, vdom_names: list):
+        out.write('#config-version=FGT3HD-6.4.5-FW-build1828-210217:opmode=0:vdom={}:user=admin\n'.format(
+            int(len(vdom_names) > 1)))
+        if len(vdom_names) > 1:
+            out.write('#global_vdom=1\nconfig vdom\n')
+            for name in vdom_names:
+                out.write('edit {}\nnext\n'.format(name))
+            out.write('end\nconfig global\n')
+        out.write('config system global\n    set hostname "FGT-BENCH"\n    set timezone 04\nend\n')
+        if len(vdom_names) > 1:
+            out.write('end\n')
+
+    def write_vdom(self, out, vdom: str, single: bool):
+        """ Tables of one vdom, inside 'config vdom' unless the config has a single vdom.
+        """
+        write = out.write
+
+        def w(line):
+            write(line + '\n')
+
+        if not single:
+            w('config vdom')
+            w('edit ' + vdom)
+        w('config system settings')
+        w('    set opmode nat')
+        w('end')
+        names = self.write_addresses(w, vdom)
+        groups = self.write_addrgrps(w, vdom, names)
+        vip_names = self.write_vips(w, vdom)
+        service_names = self.write_services(w, vdom)
+        self.write_policies(w, names + groups, vip_names, service_names)
+        if not single:
+            w('next')
+            w('end')
+
+    def write_addresses(self, w, vdom: str) -> list:
+        rnd = self.random
+        w('config firewall address')
+        w('    edit "all"')
+        w('        set uuid ' + self.uuid())
+        w('    next')
+        names = []
+        for number in range(self.addresses):
+            name = 'addr_{}_{}'.format(vdom, number)
+            names.append(name)
+            w('    edit "{}"'.format(name))
+            w('        set uuid ' + self.uuid())
+            kind = rnd.random()
+            second, third = divmod(number, 256)
+            if kind < 0.45:     # host
+                w('        set subnet 10.{}.{}.{} 255.255.255.255'.format(second % 256, third, rnd.randint(1, 254)))
+            elif kind < 0.75:   # network
+                prefix = rnd.choice((16, 20, 22, 24, 24, 24, 26, 28))
+                mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+                w('        set subnet 10.{}.{}.0 {}.{}.{}.{}'.format(second % 256, third, mask >> 24, mask >> 16 & 255,
+                                                                     mask >> 8 & 255, mask & 255))
+            elif kind < 0.85:
+                w('        set type iprange')
+                w('        set start-ip 192.168.{}.{}'.format(third, 10))
+                w('        set end-ip 192.168.{}.{}'.format(third, rnd.randint(11, 250)))
+            elif kind < 0.93:
+                w('        set type fqdn')
+                w('        set fqdn "host{}.{}.example.com"'.format(number, vdom.lower()))
+            elif kind < 0.97:
+                w('        set type geography')
+                w('        set country "{}"'.format(rnd.choice(('AU', 'NZ', 'US', 'SG', 'JP'))))
+            else:
+                w('        set type wildcard')
+                w('        set wildcard 10.{}.0.1 255.0.255.255'.format(third))
+            if rnd.random() < 0.1:
+                w('        set comment "site {}, rack {}"'.format(third, number % 40))
+            w('    next')
+        w('end')
+        return names
+
+    def write_addrgrps(self, w, vdom: str, names: list) -> list:
+        """ Groups of level 0 hold addresses, the groups of the next levels also hold groups of the level below.
+        """
+        rnd = self.random
+        w('config firewall addrgrp')
+        groups = []
+        level_groups = []
+        per_level = max(1, self.addrgrps // self.depth) if self.addrgrps else 0
+        for number in range(self.addrgrps):
+            level = min(number // per_level, self.depth - 1)
+            members = rnd.sample(names, min(len(names), rnd.randint(2, 8))) if names else ['all']
+            if level > 0 and level_groups:
+                members += rnd.sample(level_groups, min(len(level_groups), rnd.randint(1, 3)))
+            name = 'grp_{}_{}'.format(vdom, number)
+            w('    edit "{}"'.format(name))
+            w('        set uuid ' + self.uuid())
+            w('        set member ' + ' '.join('"{}"'.format(member) for member in members))
+            w('    next')
+            groups.append(name)
+            if (number + 1) % per_level == 0:
+                level_groups = groups[-per_level:]
+        w('end')
+        return groups
+
+    def write_vips(self, w, vdom: str) -> list:
+        rnd = self.random
+        w('config firewall vip')
+        vip_names = []
+        for number in range(self.vips):
+            name = 'vip_{}_{}'.format(vdom, number)
+            vip_names.append(name)
+            third, fourth = divmod(number, 250)
+            w('    edit "{}"'.format(name))
+            w('        set uuid ' + self.uuid())
+            w('        set extip 203.0.{}.{}'.format(third % 256, fourth + 1))
+            if rnd.random() < 0.2:
+                w('        set mappedip "172.16.{0}.{1}-172.16.{0}.{2}"'.format(third % 256, fourth + 1, fourth + 5))
+            else:
+                w('        set mappedip "172.16.{}.{}"'.format(third % 256, fourth + 1))
+            w('        set extintf "port1"')
+            if rnd.random() < 0.3:
+                w('        set portforward enable')
+                port = rnd.choice((80, 443, 8080, 8443))
+                w('        set extport {}'.format(port))
+                w('        set mappedport {}'.format(port))
+            w('    next')
+        w('end')
+        groups = []
+        if self.vipgrps and vip_names:
+            w('config firewall vipgrp')
+            for number in range(self.vipgrps):
+                name = 'vipgrp_{}_{}'.format(vdom, number)
+                groups.append(name)
+                w('    edit "{}"'.format(name))
+                w('        set interface "port1"')
+                w('        set member ' + ' '.join('"{}"'.format(member) for member in
+                                                   rnd.sample(vip_names, min(len(vip_names), rnd.randint(2, 6)))))
+                w('    next')
+            w('end')
+        return vip_names + groups
+
+    def write_services(self, w, vdom: str) -> list:
+        rnd = self.random
+        w('config firewall service custom')
+        service_names = []
+        for name, settings in STANDARD_SERVICES:
+            w('    edit "{}"'.format(name))
+            for setting in settings:
+                w('        ' + setting)
+            w('    next')
+            service_names.append(name)
+        for number in range(self.services):
+            name = 'svc_{}'.format(number)
+            port = 1024 + rnd.randint(0, 60000)
+            w('    edit "{}"'.format(name))
+            if rnd.random() < 0.3:
+                w('        set tcp-portrange {}-{} {}'.format(port, port + rnd.randint(1, 100), port + 1000))
+            elif rnd.random() < 0.5:
+                w('        set udp-portrange {}'.format(port))
+            else:
+                w('        set tcp-portrange {}:1024-65535'.format(port))
+            w('    next')
+            service_names.append(name)
+        w('end')
+        w('config firewall service group')
+        group_names = []
+        for number in range(max(1, self.services // 10)):
+            name = 'svcgrp_{}'.format(number)
+            members = rnd.sample(service_names, min(len(service_names), rnd.randint(2, 6))) + group_names[-1:]
+            w('    edit "{}"'.format(name))
+            w('        set member ' + ' '.join('"{}"'.format(member) for member in members))
+            w('    next')
+            group_names.append(name)
+        w('end')
+        return service_names + group_names
+
+    def write_policies(self, w, sources: list, vip_names: list, service_names: list):
+        rnd = self.random
+        destinations = sources + vip_names
+        w('config firewall policy')
+        for number in range(1, self.policies + 1):
+            w('    edit {}'.format(number))
+            if rnd.random() < 0.7:
+                w('        set name "rule-{}"'.format(number))
+            w('        set uuid ' + self.uuid())
+            w('        set srcintf "port{}"'.format(rnd.randint(1, 8)))
+            w('        set dstintf "port{}"'.format(rnd.randint(1, 8)))
+            if self.all_sources and rnd.random() * 100 < self.all_sources:
+                w('        set srcaddr "all"')
+            else:
+                w('        set srcaddr ' + self.members(sources))
+            w('        set dstaddr ' + self.members(destinations))
+            if rnd.random() < 0.8:
+                w('        set action accept')
+            w('        set schedule "always"')
+            w('        set service ' + self.members(service_names))
+            if rnd.random() < 0.3:
+                w('        set utm-status enable')
+                w('        set ssl-ssh-profile "certificate-inspection"')
+                w('        set av-profile "default"')
+            if rnd.random() < 0.6:
+                w('        set logtraffic all')
+            if rnd.random() < 0.2:
+                w('        set nat enable')
+            if rnd.random() < 0.05:
+                w('        set status disable')
+            if rnd.random() < 0.15:
+                w('        set comments "change {}, requested by team {}"'.format(rnd.randint(1000, 9999),
+                                                                                  rnd.randint(1, 20)))
+            w('    next')
+        w('end')
+
+    def members(self, names: list) -> str:
+        if not names:
+            return '"all"'
+        count = min(len(names), self.random.choice((1, 1, 1, 2, 2, 3, 5)))
+        return ' '.join('"{}"'.format(name) for name in self.random.sample(names, count))
+
+
+def vdom_names(count: int) -> list:
+    return ['root'] + ['VD{}'.format(number) for number in range(1, count)]
+
+
+def vdom_size(generator_options: dict) -> int:
+    """ Bytes of one generated vdom, used to reach the target size.
+    """
+    class Counter:
+        size = 0
+
+        def write(self, text):
+            self.size += len(text)
+
+    counter = Counter()
+    ConfigGenerator(**generator_options).write_vdom(counter, 'VD1', False)
+    return counter.size
+
+
+def generate(output_file: str, vdom_count: int, **generator_options) -> int:
+    """ Write the config file.
+    Returns:
+        size (int): bytes written.
+    """
+    generator = ConfigGenerator(**generator_options)
+    names = vdom_names(vdom_count)
+    with open(output_file, 'w') as out:
+        generator.write_header(out, names)
+        for name in names:
+            generator.write_vdom(out, name, vdom_count == 1)
+    return os.path.getsize(output_file)
+
+
+def scaled_options(size_mb: float, vdom_count: int, vdoms_given: bool, generator_options: dict) -> tuple:
+    """ vdom count and generator options giving about size_mb MB.
+    """
+    target = size_mb * 1000000
+    if not vdoms_given:
+        return max(1, round(target / vdom_size(generator_options))), generator_options
+    policy_size = (vdom_size(dict(generator_options, policies=generator_options['policies'] + 100)) -
+                   vdom_size(generator_options)) / 100
+    fixed = vdom_size(dict(generator_options, policies=0))
+    per_vdom = target / vdom_count
+    return vdom_count, dict(generator_options, policies=max(1, round((per_vdom - fixed) / policy_size)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
+    vdom_count = counts.pop('vdoms')
+    options = counts
+    if size_mb is not None:
+        vdom_count, options = scaled_options(size_mb, vdom_count, vdoms_given, options)
+    size = generate(output_file, vdom_count, **options)
+    print("Results: {} vdoms, {} policies, {:.1f} MB written to {}".format(
+        vdom_count, vdom_count * options['policies'], size / 1e6, output_file))
@@ -0,0 +1,366 @@
+#!/usr/bin/python
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Benchmark of the export scripts on synthetic backups (see generate_config.py).
+# Each engine runs as its own process on configs of each size. The wall time, throughput and peak RSS of the
+# process are printed and appended to a history csv (bench/work/results.csv by default), so runs from different
+# commits can be compared.
+# The output of every engine is checked against the first v5 engine: byte for byte for the v5 engines, and value by
+# value for the engines writing the earlier layout, where a ',' inside a value is not escaped:
+#   legacy      full_export_csv.py, which only reads the first policy table and does not resolve objects, on the raw
+#               policy fields
+#   baseline    full_export_csv_v5.py as it was before the rework (--baseline, read from git), on every column
+#               it writes. Its address groups are only expanded one level and their members are not deduplicated,
+#               so a subnet it gives must be in the v5 value and it may only leave out what the nested groups hold.
+# To benchmark a new engine add it to ENGINES.
+
+import csv
+import filecmp
+import os
+import os.path
+import platform
+import shutil
+import subprocess
+import sys, getopt, time
+from collections import namedtuple
+
+from generate_config import counts as generator_counts, generate, scaled_options
+
+BENCH_FOLDER = os.path.dirname(os.path.abspath(__file__))
+REPO_FOLDER = os.path.dirname(BENCH_FOLDER)
+
+# script: path from the repo folder, args: options after -i/-o, layout: 'v5', 'legacy' or 'baseline' output (see
+# above), warm: run once before the timed run, e.g. to fill the cache, revision: git revision the script is read
+# from ('{baseline}' for --baseline), None for the working tree
+Engine = namedtuple('Engine', ['script', 'args', 'layout', 'warm', 'revision'])
+
+# last commit before the rework of full_export_csv_v5.py, the engine is reported n/a when git does not have it
+# (shallow clone, rewritten history)
+BASELINE_REVISION = 'd02002fdc2e7d99fa8257ea82513efe9001818b2'
+
+ENGINES = {
+    'legacy': Engine('full_export_csv.py', [], 'legacy', False, None),
+    'baseline': Engine('full_export_csv_v5.py', [], 'baseline', False, '{baseline}'),
+    'v5': Engine('full_export_csv_v5.py', [], 'v5', False, None),
+    'v5-jobs': Engine('full_export_csv_v5.py', ['--jobs', str(os.cpu_count() or 1)], 'v5', False, None),
+    'v5-cached': Engine('full_export_csv_v5.py', ['--cache', '{work}/cache'], 'v5', True, None),
+}
+
+# columns resolved from the address objects and the tables of the groups, for the baseline comparison
+SUBNET_COLUMNS = ('srcsubnet', 'dstsubnet')
+GROUP_TABLES = ('config firewall addrgrp', 'config firewall vipgrp')
+
+# full_export_csv.py ignores -o and always writes to this file, relative to the folder it runs in
+LEGACY_OUTPUT = 'D:\\Extracts\\FW-ITDC-TBS-1_20200114_1735.csv'
+
+HISTORY_COLUMNS = ['date', 'revision', 'python', 'engine', 'size_mb', 'vdoms', 'lines', 'seconds', 'mb_per_s',
+                   'lines_per_s', 'peak_rss_mb', 'equivalent']
+
+sizes = [10, 100]   # MB of the generated configs
+engine_names = list(ENGINES)
+vdoms = None    # vdom count of the generated configs, None to scale it with the size
+seed = 1
+repeat = 1  # runs of each engine, the fastest one is kept
+work_dir = os.path.join(BENCH_FOLDER, 'work')
+history_file = None   # None for results.csv in the work folder
+baseline_revision = BASELINE_REVISION
+regenerate = False
+
+
+def usage():
+    """ Used to print Syntax
+    """
+    print("Syntax:\n\t{} [-s <MB[,MB...]>] [-e <engine[,engine...]>] [--vdoms <n>] [--seed <n>] [--repeat <n>] "
+          "[--work <folder>] [--history <file>] [--baseline <revision>] [--regenerate]".format(os.path.basename(__file__)))
+    print("\tengines: {}".format(', '.join(ENGINES)))
+    print("Examples:\n\t{} -s 10,100,1000".format(os.path.basename(__file__)))
+    print("\t{} -s 10,50 -e legacy,baseline,v5 --vdoms 1".format(os.path.basename(__file__)))
+
+
+def main(argv):
+    global sizes, engine_names, vdoms, seed, repeat, work_dir, history_file, baseline_revision, regenerate
+    try:
+        opts, args = getopt.getopt(argv, "hs:e:", ["sizes=", "engines=", "vdoms=", "seed=", "repeat=", "work=",
+                                                   "history=", "baseline=", "regenerate"])
+    except getopt.GetoptError:
+        print("Error:\n\tInvalid commands")
+        usage()
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == '-h':
+            usage()
+            sys.exit()
+        elif opt in ("-s", "--sizes"):
+            try:
+                sizes = [float(size) for size in arg.split(',')]
+            except ValueError:
+                print("Error:\n\tInvalid sizes {}".format(arg))
+                usage()
+                sys.exit(2)
+        elif opt in ("-e", "--engines"):
+            engine_names = arg.split(',')
+            for name in engine_names:
+                if name not in ENGINES:
+                    print("Error:\n\tUnknown engine {}".format(name))
+                    usage()
+                    sys.exit(2)
+        elif opt in ("--vdoms", "--seed", "--repeat"):
+            if not arg.isdigit() or (opt != "--seed" and int(arg) < 1):
+                print("Error:\n\tInvalid value {} for {}".format(arg, opt))
+                usage()
+                sys.exit(2)
+            if opt == "--vdoms":
+                vdoms = int(arg)
+            elif opt == "--seed":
+                seed = int(arg)
+            else:
+                repeat = int(arg)
+        elif opt == "--work":
+            work_dir = arg
+        elif opt == "--history":
+            history_file = arg
+        elif opt == "--baseline":
+            baseline_revision = arg
+        elif opt == "--regenerate":
+            regenerate = True
+
+
+def config_file(size_mb: float) -> str:
+    """ Synthetic config of about size_mb MB, generated once and reused by the next runs.
+    """
+    name = 'bench-{:g}mb-{}-seed{}.conf'.format(size_mb, 'v{}'.format(vdoms) if vdoms else 'auto', seed)
+    path = os.path.join(work_dir, name)
+    if regenerate or not os.path.isfile(path):
+        options = dict(generator_counts, seed=seed)
+        vdom_count = options.pop('vdoms')
+        vdom_count, options = scaled_options(size_mb, vdoms or vdom_count, vdoms is not None, options)
+        print("Generating {} ({} vdoms, {} policies per vdom)".format(path, vdom_count, options['policies']))
+        generate(path, vdom_count, **options)
+    return path
+
+
+def count_lines(path: str) -> int:
+    lines = 0
+    with open(path, 'rb') as config_file:
+        for chunk in iter(lambda: config_file.read(1 << 20), b''):
+            lines += chunk.count(b'\n')
+    return lines
+
+
+def engine_script(engine: Engine) -> str:
+    """ Path of the script of the engine, read from git into the work folder for an older revision.
+    Raises:
+        RuntimeError when git can not give the script of that revision.
+    """
+    if engine.revision is None:
+        return os.path.join(REPO_FOLDER, engine.script)
+    revision = engine.revision.format(baseline=baseline_revision)
+    path = os.path.join(work_dir, 'revision-{}'.format(revision), engine.script)
+    if not os.path.isfile(path):
+        try:
+            source = subprocess.run(['git', 'show', '{}:{}'.format(revision, engine.script)], cwd=REPO_FOLDER,
+                                    capture_output=True, check=True).stdout
+        except (OSError, subprocess.CalledProcessError):
+            raise RuntimeError('cannot read {} of revision {} from git'.format(engine.script, revision))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as script:
+            script.write(source)
+    return path
+
+
+def run_engine(engine: Engine, backup_file: str, output_file: str) -> tuple:
+    """ Run the engine once in its own folder.
+    Returns:
+        seconds (float): wall time of the process.
+        peak_rss (int): peak resident memory of the process in bytes, None where os.wait4 is missing.
+    """
+    run_dir = os.path.join(work_dir, 'run')
+    os.makedirs(run_dir, exist_ok=True)     # full_export_csv.py writes its output relative to the current folder
+    args = [arg.format(work=work_dir) for arg in engine.args]
+    command = [sys.executable, engine_script(engine), '-i', os.path.abspath(backup_file),
+               '-o', os.path.abspath(output_file)] + args
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=run_dir, stdout=subprocess.DEVNULL)
+    if hasattr(os, 'wait4'):
+        pid, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status
+        peak_rss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    else:
+        process.wait()
+        peak_rss = None
+    seconds = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError('{} failed with exit code {}'.format(' '.join(command), process.returncode))
+    if engine.layout == 'legacy':
+        shutil.move(os.path.join(run_dir, LEGACY_OUTPUT), output_file)
+    return seconds, peak_rss
+
+
+def split_v5_row(line: str) -> list:
+    """ Values of a line of the v5 csv layout, with the '\\,' and '\\\\' escapes undone.
+    """
+    return next(csv.reader([line], delimiter=',', quoting=csv.QUOTE_NONE, escapechar='\\'))
+
+
+def split_raw_row(line: str, header: list, v5_row: dict) -> dict:
+    """ Values of a line of the earlier layout, where a ',' inside a value is not escaped: each column takes as many
+        ','-separated pieces as its v5 value, one for a column the v5 output does not have.
+    """
+    pieces = line.split(',')
+    row = {}
+    start = 0
+    for name in header:
+        end = start + 1 + v5_row.get(name, '').count(',')
+        row[name] = ','.join(pieces[start:end])
+        start = end
+    return row
+
+
+def group_names(backup_file: str) -> set:
+    """ Names of the address and vip groups of every vdom of the config.
+    """
+    names = set()
+    tables = []
+    with open(backup_file) as config:
+        for line in config:
+            text = line.strip()
+            if text.startswith('config '):
+                tables.append(text)
+            elif text == 'end':
+                if tables:
+                    tables.pop()
+            elif text.startswith('edit ') and tables and tables[-1] in GROUP_TABLES:
+                names.add(text[5:].strip('"'))
+    return names
+
+
+def subnets_equivalent(baseline_value: str, v5_value: str, groups: set) -> bool:
+    """ The baseline subnets of a field are the v5 ones, but for the nested groups it leaves unexpanded.
+    """
+    baseline_items = set(baseline_value.split('|'))
+    v5_items = set(v5_value.split('|'))
+    nested = {item for item in baseline_items - v5_items if item in groups}
+    if not nested:
+        return baseline_items == v5_items
+    return baseline_items - nested <= v5_items
+
+
+def raw_equivalent(raw_file: str, v5_file: str, layout: str, backup_file: str) -> str:
+    """ Compare the output of an engine writing the earlier layout with the v5 output, see ENGINES.
+        The legacy output is compared on the raw policy fields, with the spaces around the values ignored.
+    Returns:
+        result (str): 'yes', 'no' or 'n/a' with the reason.
+    """
+    with open(v5_file) as v5_csv:
+        header = split_v5_row(v5_csv.readline().rstrip('\n'))
+        v5_rows = [dict(zip(header, split_v5_row(line.rstrip('\n')))) for line in v5_csv]
+    if layout == 'legacy' and len({row.get('vdom') for row in v5_rows}) > 1:
+        return 'n/a (multi-vdom)'
+    groups = group_names(backup_file) if layout == 'baseline' else set()
+    with open(raw_file) as raw_csv:
+        header = raw_csv.readline().rstrip('\n').split(',')[:-1]     # every value is followed by ','
+        raw_lines = [line.rstrip('\n') for line in raw_csv]
+    if len(v5_rows) != len(raw_lines):
+        return 'no ({} rows, {} rows)'.format(len(raw_lines), len(v5_rows))
+    nested = 0
+    for v5_row, line in zip(v5_rows, raw_lines):
+        for name, value in split_raw_row(line, header, v5_row).items():
+            if layout == 'legacy':
+                equal = name not in v5_row or value.strip() == v5_row[name].strip()
+            elif name in SUBNET_COLUMNS and name in v5_row and value != v5_row[name]:
+                equal = subnets_equivalent(value, v5_row[name], groups)
+                nested += equal
+            else:
+                equal = value == v5_row.get(name)
+            if not equal:
+                return 'no (policy {} {})'.format(v5_row.get('id'), name)
+    return 'yes' if not nested else 'yes ({} fields with nested groups)'.format(nested)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_FOLDER, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def benchmark(size_mb: float) -> list:
+    """ Run every engine on the config of size_mb MB.
+    Returns:
+        rows (list): one history row per engine.
+    """
+    backup_file = config_file(size_mb)
+    file_mb = os.path.getsize(backup_file) / 1e6
+    lines = count_lines(backup_file)
+    with open(backup_file) as config:
+        vdom_count = max(1, sum(1 for line in config if line.startswith('edit ')) // 2)
+    rows = []
+    reference = None
+    for name in engine_names:
+        engine = ENGINES[name]
+        output_file = os.path.join(work_dir, '{}-{}.csv'.format(os.path.splitext(os.path.basename(backup_file))[0],
+                                                               name))
+        try:
+            engine_script(engine)
+        except RuntimeError as e:
+            print("Warning: {}, engine {} is skipped".format(e, name))
+            rows.append(dict({column: '' for column in HISTORY_COLUMNS}, date=time.strftime('%Y-%m-%d %H:%M:%S'),
+                             revision=git_revision(), python=platform.python_version(), engine=name,
+                             equivalent='n/a (no revision)'))
+            continue
+        if engine.warm:
+            run_engine(engine, backup_file, output_file)
+        seconds, peak_rss = min((run_engine(engine, backup_file, output_file) for run in range(repeat)),
+                                key=lambda run: run[0])
+        if engine.layout != 'v5':
+            equivalent = output_file    # compared once the reference is known
+        elif reference is None:
+            reference = output_file
+            equivalent = 'reference'
+        else:
+            equivalent = 'yes' if filecmp.cmp(reference, output_file, shallow=False) else 'no'
+        rows.append({'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'revision': git_revision(),
+                     'python': platform.python_version(), 'engine': name, 'size_mb': '{:.1f}'.format(file_mb),
+                     'vdoms': vdom_count, 'lines': lines, 'seconds': '{:.2f}'.format(seconds),
+                     'mb_per_s': '{:.2f}'.format(file_mb / seconds), 'lines_per_s': '{:.0f}'.format(lines / seconds),
+                     'peak_rss_mb': '{:.1f}'.format(peak_rss / 1e6) if peak_rss is not None else '',
+                     'equivalent': equivalent})
+    for row in rows:
+        layout = ENGINES[row['engine']].layout
+        if layout != 'v5' and row['seconds']:
+            row['equivalent'] = (raw_equivalent(row['equivalent'], reference, layout, backup_file) if reference
+                                 else 'n/a (no v5 engine)')
+    return rows
+
+
+def print_rows(rows: list):
+    print('{:<10}  {:>8}  {:>8}  {:>8}  {:>11}  {:>9}  {}'.format('engine', 'MB', 'seconds', 'MB/s', 'lines/s',
+                                                                 'RSS MB', 'equivalent'))
+    for row in rows:
+        print('{:<10}  {:>8}  {:>8}  {:>8}  {:>11}  {:>9}  {}'.format(
+            row['engine'], row['size_mb'], row['seconds'], row['mb_per_s'], row['lines_per_s'], row['peak_rss_mb'],
+            row['equivalent']))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
+    os.makedirs(work_dir, exist_ok=True)
+    if history_file is None:
+        history_file = os.path.join(work_dir, 'results.csv')
+    # the cached engine times a cache filled by its own warm-up run
+    shutil.rmtree(os.path.join(work_dir, 'cache'), ignore_errors=True)
+    new_history = not os.path.isfile(history_file)
+    with open(history_file, 'a', newline='') as history:
+        writer = csv.DictWriter(history, HISTORY_COLUMNS)
+        if new_history:
+            writer.writeheader()
+        for size_mb in sizes:
+            print('*' * 60)
+            rows = benchmark(size_mb)
+            print_rows(rows)
+            writer.writerows(rows)
+            history.flush()
+    print('*' * 60)
+    print("Results: {} sizes, {} engines, history in {}".format(len(sizes), len(engine_names), history_file))
@@ -5,30 +5,88 @@
 
 # The input file name should be a good backup config from the FortiGate and must contain 'config firewall policy'
 # In this version the script export firewall from all vdom, each policy has its vdom name in the first column.
+# The backup file is read only once, see fwpolicy/parser.py
+# With --jobs N the vdoms are exported by N processes in parallel.
+# --vdom and --resolve only read the part of the file they need, see fwpolicy/index.py
+# --batch exports a folder of backup files, one process per file, see fwpolicy/batch.py
+# --diff writes only what changed since an older backup of the same device, see fwpolicy/diff.py
+# --query lists the policies whose source or destination contains an IP, see fwpolicy/query.py
+# --analyse finds shadowed, redundant and mergeable policies, see fwpolicy/analysis.py
+# --format writes standard csv, parquet or arrow instead, a .gz or .zst output is compressed, see fwpolicy/writer.py
+# --stats prints the time of each stage, --profile also dumps a cProfile of the run, see fwpolicy/stats.py
+# --objects also writes the subnets of every address object and group
+# The modules of the other modes are only imported when the mode is used, so a plain export starts quickly.
+# To export from another program use the library entry points instead, see fwpolicy/api.py
 
-import re, os.path
+import os.path
 import sys, getopt, time
 
+from fwpolicy.export import export_results, merge_columns, write_object_subnets, write_policies
+from fwpolicy.stats import ProgressReporter, print_stats, start_profile
+from fwpolicy.writer import OUTPUT_FORMATS, check_output, open_writer
+
 # change the in/out file location here if runs from IDE
 #
 
 backup_file = 'in\\sydney-full.conf'
 output_file = 'out\\sydney-full.csv'
 object_name = ''
+jobs = 1    # number of processes, each vdom is exported by one of them
+vdom_filter = None  # export only this vdom
+resolve_name = None     # only print the subnets of this object
+use_index = False   # keep the offset index in a sidecar file next to the backup
+cache_dir = None    # folder of the parsed results cache, None to always parse
+batch_source = None     # folder or glob of backup files, -o is then the output folder
+combine = False     # batch mode writes one csv with a device column instead of one csv per device
+diff_file = None    # older backup of the same device, -o is then the list of changes
+queries = []    # IPs, subnets or ranges to find the policies of, -o is then the list of matching policies
+analyse = False     # -o is the list of shadowed, redundant and mergeable policies
+output_format = 'csv'   # csv, excel, parquet or arrow
+show_stats = False  # print the time of each stage, the peak memory and the counts of each vdom
+profile_file = None     # cProfile output of the run
+objects_file = None     # 'vdom-object:subnets' of every object, None to skip it
 
 def usage():
     """ Used to print Syntax
     """
-    print("Syntax:\n\t{} -i <inputfile> -o <outputfile>".format(os.path.basename(__file__)))
+    print("Syntax:\n\t{0} -i <inputfile> -o <outputfile> [-j <jobs>] [-v <vdom>] [-r <object>] [--index] [--cache <folder>] [--objects <file>] [--stats] [--profile <file>]\n\t{0} -b <folder or glob> -o <outputfolder> [-j <jobs>] [--combine]\n\t{0} -i <inputfile> -d <olderfile> -o <changesfile> [--cache <folder>]\n\t{0} -i <inputfile> -q <ip[,ip...]> [--query-file <file>] -o <matchesfile> [-v <vdom>]\n\t{0} -i <inputfile> --analyse -o <findingsfile> [-v <vdom>]\n\tany of the above with [-f csv|excel|parquet|arrow]".format(os.path.basename(__file__)))
     print("Examples:\n\t{} -i backup-config.conf -o results.csv".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -o results.csv --jobs 8".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -o results.csv --vdom VD1 --index".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf --resolve All_Internal_Nets --vdom root".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -o results.csv --cache cache".format(os.path.basename(__file__)))
+    print("\t{} -b backups -o results --jobs 8".format(os.path.basename(__file__)))
+    print("\t{} -b 'backups/*-fw*.conf' -o all-devices.csv --combine --jobs 8".format(os.path.basename(__file__)))
+    print("\t{} -i today.conf -d yesterday.conf -o changes.csv --cache cache".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -q 10.20.30.40,10.1.0.0/16 -o matches.csv".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf --analyse -o findings.csv".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -o results.csv.gz --format excel".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -o results.parquet --format parquet".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -o results.csv --stats --profile export.prof".format(os.path.basename(__file__)))
+    print("\t{} -i backup-config.conf -o results.csv --objects objectsubnet.txt".format(os.path.basename(__file__)))
 
 
 def main(argv):
     global backup_file
     global output_file
     global object_name
+    global jobs
+    global vdom_filter
+    global resolve_name
+    global use_index
+    global cache_dir
+    global batch_source
+    global combine
+    global diff_file
+    global analyse
+    global output_format
+    global show_stats
+    global profile_file
+    global objects_file
     try:
-        opts, args = getopt.getopt(argv, "hi:o:", ["ifile=", "ofile="])
+        opts, args = getopt.getopt(argv, "hi:o:j:v:r:b:d:q:f:",
+                                   ["ifile=", "ofile=", "jobs=", "vdom=", "resolve=", "index", "cache=", "batch=", "combine",
+                                                     "diff=", "query=", "query-file=", "analyse", "format=", "stats", "profile=", "objects="])
     except getopt.GetoptError:
         print("Error:\n\tInvalid commands")
         usage()
@@ -41,313 +99,197 @@ def main(argv):
             backup_file = arg
         elif opt in ("-o", "--ofile"):
             output_file = arg
+        elif opt in ("-j", "--jobs"):
+            if not arg.isdigit() or int(arg) < 1:
+                print("Error:\n\tInvalid number of jobs {}".format(arg))
+                usage()
+                sys.exit(2)
+            jobs = int(arg)
+        elif opt in ("-v", "--vdom"):
+            vdom_filter = arg
+        elif opt in ("-r", "--resolve"):
+            resolve_name = arg
+        elif opt == "--index":
+            use_index = True
+        elif opt == "--cache":
+            cache_dir = arg
+        elif opt in ("-b", "--batch"):
+            batch_source = arg
+        elif opt == "--combine":
+            combine = True
+        elif opt in ("-d", "--diff"):
+            diff_file = arg
+        elif opt in ("-q", "--query"):
+            queries.extend(query for query in arg.split(',') if query.strip())
+        elif opt == "--analyse":
+            analyse = True
+        elif opt in ("-f", "--format"):
+            if arg not in OUTPUT_FORMATS:
+                print("Error:\n\tInvalid output format {}".format(arg))
+                usage()
+                sys.exit(2)
+            output_format = arg
+        elif opt == "--stats":
+            show_stats = True
+        elif opt == "--profile":
+            show_stats = True
+            profile_file = arg
+        elif opt == "--objects":
+            objects_file = arg
+        elif opt == "--query-file":
+            from fwpolicy.query import read_queries
+            try:
+                queries.extend(read_queries(arg))
+            except IOError as e:
+                print("Input file error: {} or file {} is in used".format(e.strerror, arg))
+                usage()
+                sys.exit()
 
 
-def get_columns(infile: str):
-    """ Used to extract FW policy objects list
-        The backup config file must contain 'config firewall policy' command.
-    Parameters:
-        infile (str): Input file contains FW policy only as input.
-    Returns:
-        columns (list): List of object name.
-    """
+if __name__ == "__main__":
+    main(sys.argv[1:])
     try:
-        with open(infile, 'r') as config_file:
-            policy_start = False
-            policy_stop = False
-            column_name = ['vdom', 'id', 'srcaddr', 'srcsubnet', 'dstaddr', 'dstsubnet']
-            for line in config_file:
-                if re.findall(r'config firewall policy', line):
-                    policy_start = True
-                    policy_stop = False
-                elif re.findall(r'^end', line):
-                    if policy_start:
-                        policy_stop = True
-                elif policy_start and not policy_stop:
-                    if re.findall(r'set uuid .*', line):
-                        continue
-                    elif re.findall(r'set name .*', line):
-                        continue
-                    elif re.findall(r'set\s', line):
-                        set_value = line.strip('\n').strip(' ').split(' ')
-                        policy_object = set_value[1]
-                        if policy_object not in column_name:
-                            column_name.append(policy_object)
-            return column_name
-    except IOError as e:
-        print("Input file error: {} or file {} is in used".format(e.strerror, infile))
-        usage()
+        check_output(output_file, output_format)
+    except ImportError as e:
+        print("Error: {}".format(e))
         sys.exit()
+    if profile_file is not None:
+        start_profile(profile_file)
 
-
-def get_object_subnet() -> dict:
-    """
-    Get IP subnet from address object
-    :param addr_object: address name
-    :param vdom: current vdom name
-    :param infile: config file in the list
-    :return: list of IP subnet
-    """
-    # global config_file
-    # with open(backup_file) as infile:
-    line_num = 0
-    subnet_list = []
-    fw_address = False
-    fw_group = False
-    vip_address = False
-    vip_grp = False
-    vd_name = 'root'
-    extip = ''
-    mappedip = ''
-    object_table = dict()
-    infile = open(backup_file)
-    for cmd_line in infile:
-        line_num += 1  # monitor config line number for troubleshooting
-        if re.findall(r'^edit .*', cmd_line):  # extract vdom name
-            vd_name = cmd_line.strip('\n')[5:]
-        elif re.fullmatch(r'config firewall address\n', cmd_line):
-            fw_address = True  # start matching address object for wanted vdom
-            fw_group = False
-        elif re.fullmatch(r'config firewall addrgrp\n', cmd_line):
-            fw_group = True  # start matching address group object
-            fw_address = False
-        elif re.fullmatch(r'config firewall vip\n', cmd_line):
-            vip_address = True
-        elif re.fullmatch(r'config firewall vipgrp\n', cmd_line):
-            vip_grp = True
-        elif re.findall(r'^end', cmd_line):
-            if fw_address:
-                fw_address = False  # end of firewall address block
-            if fw_group:
-                fw_group = False  # end of address group object
-            if vip_address:
-                vip_address = False
-            if vip_grp:
-                vip_grp = False
-        elif (fw_address or fw_group or vip_address or vip_grp):
-            if re.findall('\s{4}edit ".*"', cmd_line):   # extract object name, it could be any object,
-                object_name = vd_name + '-'+ cmd_line.strip(' ').strip('\n')[5:].strip('"')
-            elif re.findall('set member .*', cmd_line):
-                member_list = cmd_line.strip('\n').strip(' ')[11:].strip('"').split('" "')  # get list of members
-                subnet_list.clear()
-
-                for member in member_list:
-                    vd_member = vd_name + '-' + member
-                    if vd_member in object_table.keys():
-                        subnet_list.append(object_table[vd_member])
-                    else:
-                        subnet_list.append(member)
-                object_table[object_name] = '|'.join(x for x in subnet_list) # store object subnet to object table
-            elif re.findall(r'set extip .*', cmd_line):
-                extip = cmd_line.strip(' ').strip('\n')[10:]
-                # subnet_list.append(extip)
-            elif re.findall(r'set mappedip .*',cmd_line):
-                mappedip = cmd_line.strip(' ').strip('\n')[13:].strip('"')
-                if extip == '':
-                    extip = '0.0.0.0'
-                object_table[object_name] = extip+'->'+mappedip
-            elif re.findall(r'set ip .*', cmd_line):
-                mappedip = cmd_line.strip(' ').strip('\n')[7:].strip('"')
-                if extip == '':
-                    extip = '0.0.0.0'
-                object_table[object_name] = extip+'->'+mappedip
-            elif re.findall(r'set subnet .*', cmd_line):  # indicates object is address object and extract the ipmask
-                ip_mask = cmd_line.strip(' ').strip('\n')[11:].split(' ')
-                bits = subnet_bits(ip_mask[1])
-                if bits == 32:
-                    object_table[object_name] = ip_mask[0]
-                else:
-                    object_table[object_name] = ip_mask[0] + '/' + str(bits)
-            elif re.findall(r'set start-ip .*', cmd_line):  # indicate IP range start IP
-                start_ip = cmd_line.strip(' ').strip('\n')[13:]
-            elif re.findall(r'set end-ip .*', cmd_line):
-                end_ip = cmd_line.strip(' ').strip('\n')[11:]  # indicate IP range end IP
-                object_table[object_name] = (start_ip + '-' + end_ip)  # combine the range
-            elif re.findall(r'set wildcard .*', cmd_line):  # indicate wildcard mask object
-                subnet = cmd_line.strip(' ').strip('\n')[13:]
-                object_table[object_name] = subnet
-            elif re.findall(r'set country .*', cmd_line):  # indicate geography object
-                subnet = cmd_line.strip(' ').strip('\n')[12:].strip('"')
-                object_table[object_name] = subnet
-            elif re.findall(r'set fqdn .*', cmd_line):  # indicates FQDN object
-                subnet = cmd_line.strip(' ').strip('\n')[9:].strip('"')
-                object_table[object_name] = subnet
-    return object_table
-
-
-def subnet_bits(subnet: str) -> int:
-    octets = subnet.split('.')
-    bits = ''
-    for octet in octets:
-        bits += bin(int(octet)).replace('0b', '')
-    return bits.count('1')
-
-
-def get_objects(infile: str) -> list:
-
-    with open(infile) as source_file:
-        file_data = source_file.read().split('\n')
-        object_list = []
-        fw_address = []
-        fw_addrgrp = []
-        fw_vip = []
-        fw_vipgrp = []
-        for command_line in file_data:
-            if re.fullmatch(r'config vdom', command_line):
-                object_list.append(command_line)
-            elif re.fullmatch(r'edit .*', command_line):
-                object_list.append(command_line)
-            elif re.fullmatch(r'next', command_line):
-                object_list.append(command_line)
-            elif re.fullmatch(r'config firewall address', command_line):
-                object_list.append(command_line)
-                fw_address = True
-            elif re.fullmatch(r'config firewall addrgrp', command_line):
-                object_list.append(command_line)
-                fw_addrgrp = True
-            elif re.fullmatch(r'config firewall vip', command_line):
-                object_list.append(command_line)
-                fw_vip = True
-            elif re.fullmatch(r'config firewall vipgrp', command_line):
-                object_list.append(command_line)
-                fw_vipgrp = True
-            elif re.fullmatch(r'end',command_line):
-                if fw_address:
-                    object_list.append(command_line)
-                    fw_address = False
-                if fw_addrgrp:
-                    object_list.append(command_line)
-                    fw_addrgrp = False
-                if fw_vip:
-                    object_list.append(command_line)
-                    fw_vip = False
-                if fw_vipgrp:
-                    object_list.append(command_line)
-                    fw_vipgrp = False
-            else:
-                if fw_address or fw_addrgrp or fw_vip or fw_vipgrp:
-                    object_list.append(command_line)
-        source_file.close()
-    return object_list
-
-
-if __name__ == "__main__":
-    main(sys.argv[1:])
+    if batch_source is not None:
+        from fwpolicy.batch import find_backups, print_summary, run_batch
+        backup_files = find_backups(batch_source)
+        if not backup_files:
+            print("There is no backup file in {}".format(batch_source))
+            sys.exit()
+        print("Please wait! I am working on {} files".format(len(backup_files)))
+        print('*' * 60)
+        started = time.perf_counter()
+        try:
+            summary = run_batch(backup_files, output_file, jobs, combine, cache_dir, output_format)
+        except IOError as e:
+            print("Error: Cannot write output {} - {}".format(output_file, e.strerror))
+            usage()
+            sys.exit()
+        print_summary(summary, time.perf_counter() - started)
+        sys.exit()
 
     print("Please wait! I am working on {}".format(backup_file))
     print('*' * 60)
-    hit = 0  # count number of policies matched
-    policy_block = "false"
-    rows = [' ']  # policy place holder
 
-    columns = get_columns(backup_file)
-    rows *= len(columns)  # copy column structure, number max of column
+    if analyse:
+        from fwpolicy.analysis import write_findings
+        try:
+            counts = write_findings(output_file, backup_file, vdom_filter, use_index, output_format)
+        except IOError as e:
+            print("Error: {} - {}".format(e.filename, e.strerror))
+            usage()
+            sys.exit()
+        print("Results: {} shadowed, {} redundant, {} duplicate, {} mergeable policies exported to {}".format(
+            *[counts.get(finding, 0) for finding in ('shadowed', 'redundant', 'duplicate', 'mergeable')], output_file))
+        sys.exit()
+
+    if queries:
+        from fwpolicy.query import build_range_index, write_matches
+        try:
+            ranges = build_range_index(backup_file, vdom_filter, use_index)
+        except IOError as e:
+            print("Input file error: {} or file {} is in used".format(e.strerror, backup_file))
+            usage()
+            sys.exit()
+        try:
+            hit, errors = write_matches(output_file, ranges, queries, vdom_filter, output_format)
+        except IOError as e:
+            print("Error: Cannot open Output file {} - {}".format(output_file, e.strerror))
+            usage()
+            sys.exit()
+        for query in errors:
+            print("Warning: {} is not an IP, subnet or range".format(query))
+        print("Results: {} policies matching {} queries exported to {}".format(hit, len(queries), output_file))
+        sys.exit()
 
-    new_dict = get_object_subnet()
+    if diff_file is not None:
+        from fwpolicy.diff import load_fingerprints, write_diff
+        try:
+            old = load_fingerprints(diff_file, jobs, cache_dir)
+            new = load_fingerprints(backup_file, jobs, cache_dir)
+        except IOError as e:
+            print("Input file error: {} or file {} is in used".format(e.strerror, e.filename))
+            usage()
+            sys.exit()
+        try:
+            counts = write_diff(output_file, old, new, output_format)
+        except IOError as e:
+            print("Error: Cannot open Output file {} - {}".format(output_file, e.strerror))
+            usage()
+            sys.exit()
+        for item_type in ('policy', 'object'):
+            print("{}: {} added, {} removed, {} modified".format(
+                item_type, *[counts.get((item_type, change), 0) for change in ('added', 'removed', 'modified')]))
+        print("Results: changes from {} exported to {}".format(diff_file, output_file))
+        sys.exit()
 
-    # Begin writing output header, the outFile will remain opened until the end.
+    # one pass over the backup file collects the columns, the address objects and the policies.
+    # With more than one job each vdom section is exported by its own process, results are merged in file order.
+    # The offset index lets a single vdom or object be read without going through the rest of the file.
+    # A run with --cache reuses the results of an earlier run on the same file content.
     try:
-        outFile = open(output_file, 'w')
-        for field in columns:
-            outFile.write(field + ',')
-        outFile.write('\n')
+        if resolve_name is not None:
+            from fwpolicy.index import load_index
+            from fwpolicy.objects import resolve_object
+            index = load_index(backup_file, use_index)
+            found = False
+            for vdom_name in ([vdom_filter] if vdom_filter is not None else index.vdom_names()):
+                subnets, cycles = resolve_object(backup_file, index, vdom_name, resolve_name)
+                if subnets is not None:
+                    found = True
+                    print("{}-{}:{}".format(vdom_name, resolve_name, subnets))
+                for group_vdom, group in cycles:
+                    print("Warning: address group {} in vdom {} contains itself".format(group, group_vdom))
+            if not found:
+                print("There is no object {} in the input file {}".format(resolve_name, backup_file))
+            sys.exit()
+
+        started = time.perf_counter()
+        results, cached = export_results(backup_file, jobs, vdom_filter, use_index, cache_dir, ProgressReporter())
+        if cached:
+            print("Using cached results of {}".format(backup_file))
     except IOError as e:
-        print("Error: Cannot open Output file {} - {}".format(output_file, e.strerror))
+        print("Input file error: {} or file {} is in used".format(e.strerror, backup_file))
         usage()
         sys.exit()
-    # End writing output header
 
+    # Begin writing output header, the output file will remain opened until the end.
     try:
-        with open(backup_file, 'r') as config_file:
-            policy_block = False
-            end_policy = False
-            vdom_name = 'root'
-            line = 0
-            for command_line in config_file:
-                line += 1
-                if re.findall(r'^edit .*', command_line):
-                    vdom_name = command_line[5:].strip('\n')
-                    print('working on vdom {} line {}'.format(vdom_name, line))
-                elif re.findall(r'config firewall policy', command_line):
-                    policy_block = True
-                    end_policy = False
-                elif re.findall(r'^end', command_line):
-                    if policy_block:
-                        end_policy = True
-                elif policy_block and not end_policy:
-                    if re.findall(r'edit \d{1,}', command_line):
-                        policy_id = command_line.strip(' ').strip('\n').split(' ')
-                        rows[0] = vdom_name
-                        rows[1] = policy_id[1]
-                        hit += 1
-                    elif re.findall(r'set uuid .*', command_line):
-                        continue
-                    elif re.findall(r'set name .*', command_line):
-                        continue
-                    elif re.findall(r'set srcaddr .*', command_line):
-                        src_addrs = command_line.strip(' ').strip('\n')[12:]
-                        idx = columns.index("srcaddr")
-                        rows[idx] = src_addrs
-                        src_addr = []
-                        src_addr = command_line.strip('\n').strip(' ')[12:].strip('"').split('" "')
-                        new_src_addr = []
-                        for member in src_addr:
-                            vdom_member = vdom_name + '-' + member
-                            if vdom_member in new_dict.keys():
-                                new_src_addr.append(new_dict[vdom_member])
-                            else:
-                                new_src_addr.append(member)
-                        subnets = '|'.join(str(x) for x in new_src_addr)
-                        idx = columns.index("srcsubnet")
-                        rows[idx] = subnets
-                    elif re.findall(r'set dstaddr .*', command_line):
-                        dst_addrs = command_line.strip('\n').strip(' ')[12:]
-                        idx = columns.index("dstaddr")
-                        rows[idx] = dst_addrs
-                        dst_addr = []
-                        dst_addr = command_line.strip('\n').strip(' ')[12:].strip('"').split('" "')
-                        new_dst_addr = []
-                        for member in dst_addr:
-                            vdom_member = vdom_name + '-' + member
-                            if vdom_member in new_dict.keys():
-                                new_dst_addr.append(new_dict[vdom_member])
-                            else:
-                                new_dst_addr.append(member)
-                                # object_table[member] = subnets
-                        subnets = '|'.join(str(x) for x in new_dst_addr)
-                        idx = columns.index("dstsubnet")
-                        rows[idx] = subnets
-
-                    elif re.findall(r'set\s', command_line):
-                        value = command_line.strip('\n').strip(' ').split(' ')
-                        object = value[1]
-                        if object not in columns:  # hardly hit this conditions , just in case a field is missing
-                            columns.append(object)
-                            rows.append('')
-                        idx = columns.index(object)  # find the index of field name in the column
-                        options = ''  # contains all the values
-                        for option in value[2:]:  # skip 'set object' and take the value only
-                            options += option + ' '
-                        rows[idx] = options  # save value to the corresponding field
-                    elif re.findall(r'next', command_line):  # end of policy - flush to output file
-                        for eachSetup in rows:
-                            # if eachSetup != '':
-                            outFile.write(eachSetup + ',')
-                        outFile.write('\n')
-                        rows = [' ']  # reset the policy place holder
-                        rows *= len(columns)
+        writer = open_writer(output_file, merge_columns(results), output_format=output_format)
+        writer.write_header()
     except IOError as e:
-        print("Input file error: {} or file {} is in used".format(e.strerror, backup_file))
+        print("Error: Cannot open Output file {} - {}".format(output_file, e.strerror))
         usage()
         sys.exit()
+    # End writing output header
+
+    write_started = time.perf_counter()
+    hit = write_policies(writer, results)  # count number of policies matched
+    writer.close()  # close output file
+    write_seconds = time.perf_counter() - write_started
+
     if hit > 0:
         print("Results: {} policies exported to {}".format(hit, output_file))
     else:
         print("There is no firewall policy in the input file {}".format(backup_file))
 
-    file = open("out\\objectsubnet.txt", 'w')
-    for x in new_dict.keys():
-        file.write(x + ':'+ str(new_dict[x])+'\n')
-    file.close()
+    for result in results:
+        for vdom_name, group in result.cycles:
+            print("Warning: address group {} in vdom {} contains itself".format(group, vdom_name))
+        for vdom_name, group in result.service_cycles:
+            print("Warning: service group {} in vdom {} contains itself".format(group, vdom_name))
+
+    if objects_file is not None:
+        try:
+            write_object_subnets(objects_file, results)
+        except IOError as e:
+            print("Error: Cannot open Output file {} - {}".format(objects_file, e.strerror))
 
-    outFile.close()  # close output file
+    if show_stats:
+        print_stats(results, write_seconds, time.perf_counter() - started, cached)
@@ -0,0 +1,17 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Helpers shared by the export scripts: reading the FortiGate backup config and
+# building the firewall object table and policy records from it.
+# The library entry points of api.py are importable from here, they are only loaded on first use so the
+# scripts do not pay for the modules they do not need:
+#   from fwpolicy import parse, export_policies
+
+__all__ = ['parse', 'resolve_objects', 'resolve_services', 'export_policies']
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        from fwpolicy import api
+        return getattr(api, name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
@@ -0,0 +1,175 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Numeric model of the address values: IPv4 addresses are kept as integers in arrays and only turned back into
+# text ('10.0.0.0/24', '10.0.0.1-10.0.0.9', 'ext->mapped') when the value is written out.
+# Every value also has its integer (start, end) ranges, which can be compared, merged and searched.
+
+import socket
+import struct
+from array import array
+
+# kind of a value
+TEXT = 0    # fqdn, country, wildcard or a name that is not an object, kept as text
+SUBNET = 1  # ip and prefix length
+RANGE = 2   # start-ip and end-ip
+VIP = 3     # external range mapped to an internal range
+
+# form of the sides of a VIP value, a side configured as 'start-end' is shown so even when start and end are equal
+VIP_EXTERNAL_RANGE = 1
+VIP_MAPPED_RANGE = 2
+
+ALL_ADDRESSES = (0, 0xFFFFFFFF)
+
+_ip_struct = struct.Struct('!L')
+
+
+def ip_to_int(ip: str) -> int:
+    """ '10.0.0.1' to 167772161, raises ValueError when ip is not a dotted quad IPv4 address.
+        Short, hex or octal forms ('10.1', '0x0a.0.0.1', '010.0.0.1') and trailing text are refused, unlike
+        socket.inet_aton which reads them as another address.
+    """
+    try:
+        return _ip_struct.unpack(socket.inet_pton(socket.AF_INET, ip))[0]
+    except (OSError, TypeError):
+        raise ValueError('invalid IPv4 address {!r}'.format(ip))
+
+
+def int_to_ip(value: int) -> str:
+    return socket.inet_ntoa(_ip_struct.pack(value))
+
+
+def mask_bits(mask: str) -> int:
+    """ Number of bits set in a dotted mask, '255.255.255.0' gives 24.
+    """
+    return bin(ip_to_int(mask)).count('1')
+
+
+def prefix_range(ip: int, prefix: int) -> tuple:
+    """ (first, last) address of the network of ip.
+    """
+    host_bits = 0xFFFFFFFF >> prefix if prefix < 32 else 0
+    return ip & ~host_bits & 0xFFFFFFFF, ip | host_bits
+
+
+def parse_range(text: str) -> tuple:
+    """ '10.0.0.1' or '10.0.0.1-10.0.0.9' to (start, end), raises ValueError for anything else.
+    """
+    start, _, end = text.partition('-')
+    start = ip_to_int(start.strip())
+    return start, ip_to_int(end.strip()) if end else start
+
+
+def format_range(start: int, end: int) -> str:
+    """ 'start-end', also when start and end are the same address, as configured.
+    """
+    return int_to_ip(start) + '-' + int_to_ip(end)
+
+
+def merge_ranges(ranges) -> list:
+    """ Sorted (start, end) ranges with the overlapping and adjacent ones merged.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def complement_ranges(ranges: list) -> list:
+    """ Addresses outside of merged ranges, e.g. what a negated srcaddr/dstaddr matches.
+    """
+    complement = []
+    start = ALL_ADDRESSES[0]
+    for first, last in ranges:
+        if first > start:
+            complement.append((start, first - 1))
+        start = last + 1
+    if start <= ALL_ADDRESSES[1]:
+        complement.append((start, ALL_ADDRESSES[1]))
+    return complement
+
+
+class AddressTable:
+    """ Distinct address values of a config, each one has an id. Equal values share the same id.
+        The values are held in arrays: kind and ip/prefix for the display, the (start, end) ranges in a
+        flat array indexed by range_offsets.
+    """
+    __slots__ = ('ids', 'kinds', 'ips', 'prefixes', 'range_offsets', 'range_starts', 'range_ends', 'texts')
+
+    def __init__(self):
+        self.ids = dict()   # value key to id
+        self.kinds = array('B')
+        self.ips = array('L')   # ip of SUBNET values, as configured (not masked)
+        self.prefixes = array('B')  # prefix length of SUBNET values, VIP_*_RANGE flags of VIP values
+        self.range_offsets = array('L', [0])    # ranges of value i are range_offsets[i]:range_offsets[i + 1]
+        self.range_starts = array('L')
+        self.range_ends = array('L')
+        self.texts = dict()     # id to text of the TEXT values
+
+    def _add(self, key: tuple, kind: int, ip: int, prefix: int, ranges) -> int:
+        value_id = self.ids.get(key)
+        if value_id is None:
+            value_id = self.ids[key] = len(self.kinds)
+            self.kinds.append(kind)
+            self.ips.append(ip)
+            self.prefixes.append(prefix)
+            for start, end in ranges:
+                self.range_starts.append(start)
+                self.range_ends.append(end)
+            self.range_offsets.append(len(self.range_starts))
+        return value_id
+
+    def add_subnet(self, ip: int, prefix: int) -> int:
+        return self._add((SUBNET, ip, prefix), SUBNET, ip, prefix, [prefix_range(ip, prefix)])
+
+    def add_range(self, start: int, end: int) -> int:
+        return self._add((RANGE, start, end), RANGE, 0, 0, [(start, end)])
+
+    def add_vip(self, external: tuple, mapped: tuple, form: int = 0) -> int:
+        """ Both the external and the mapped range are ranges of the vip. form has VIP_EXTERNAL_RANGE and
+            VIP_MAPPED_RANGE set for the sides configured as 'start-end', the others are a single address.
+        """
+        return self._add((VIP, external, mapped, form), VIP, 0, form, [external, mapped])
+
+    def add_text(self, text: str, ranges: tuple = ()) -> int:
+        """ Value shown as text. ranges is set for an address left at its default 0.0.0.0/0, which is shown
+            by its name like the earlier versions did.
+        """
+        value_id = self._add((TEXT, text, ranges), TEXT, 0, 0, ranges)
+        self.texts[value_id] = text
+        return value_id
+
+    def ranges(self, value_id: int) -> list:
+        """ (start, end) ranges of the value, empty for a value such as fqdn or country.
+        """
+        first, last = self.range_offsets[value_id], self.range_offsets[value_id + 1]
+        return list(zip(self.range_starts[first:last], self.range_ends[first:last]))
+
+    def text(self, value_id: int) -> str:
+        """ Display form of the value.
+        """
+        kind = self.kinds[value_id]
+        if kind == SUBNET:
+            if self.prefixes[value_id] == 32:
+                return int_to_ip(self.ips[value_id])
+            return int_to_ip(self.ips[value_id]) + '/' + str(self.prefixes[value_id])
+        if kind == TEXT:
+            return self.texts[value_id]
+        first = self.range_offsets[value_id]
+        if kind == RANGE:
+            return format_range(self.range_starts[first], self.range_ends[first])
+        form = self.prefixes[value_id]
+        sides = []
+        for offset, flag in ((first, VIP_EXTERNAL_RANGE), (first + 1, VIP_MAPPED_RANGE)):
+            if form & flag:
+                sides.append(format_range(self.range_starts[offset], self.range_ends[offset]))
+            else:
+                sides.append(int_to_ip(self.range_starts[offset]))
+        return '->'.join(sides)
+
+    def __len__(self):
+        return len(self.kinds)
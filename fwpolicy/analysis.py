@@ -0,0 +1,377 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Shadowed, redundant and mergeable policies.
+#   shadowed   an earlier policy of the vdom matches all the traffic of the policy with another action,
+#              the policy is never hit
+#   redundant  same as shadowed but the earlier policy has the same action, the policy can be removed
+#   duplicate  an earlier policy has the same settings
+#   mergeable  an earlier policy has the same settings except the source, the destination or the service
+# A policy covers another when its interfaces, schedule, users/groups, source, destination and service each cover
+# those of the other. The policies are grouped by context (interfaces, schedule and users/groups), each group keeps
+# an interval index of its distinct sources and of its distinct destinations. The values covering a source or a
+# destination are the intersection of the values holding each of its ranges (stabs of the index, shared by all the
+# values with that range), and the earlier policies are looked up from the covering sources or the covering
+# destinations, whichever leads to fewer policies, in config order, then filtered by the other side and the
+# service, so the policies are not compared pair by pair.
+# Policies with a negated source, destination or service, or an internet service, are not searched for covering
+# policies and do not cover others.
+# Only the IPv4 policies of 'firewall policy' are analysed, the addresses of the policy6/policy46/policy64 tables are
+# not in the IPv4 address table and their ids overlap with the IPv4 ones.
+
+from bisect import bisect_right
+
+from fwpolicy.addresses import ALL_ADDRESSES
+from fwpolicy.index import load_index
+from fwpolicy.intervals import IntervalIndex
+from fwpolicy.lexer import split_values
+from fwpolicy.objects import get_object_table
+from fwpolicy.parser import POLICY_TABLE, get_policies
+from fwpolicy.services import ALL_SERVICES, get_service_table
+from fwpolicy.tree import DEFAULT_VDOM, parse_config
+from fwpolicy.writer import ColumnRegistry, open_writer
+
+FINDING_COLUMNS = ['vdom', 'id', 'finding', 'by', 'detail']
+
+ANY_INTERFACE = 'any'
+ANY_SERVICE = 'ALL'
+ANY_SCHEDULE = 'always'
+IDENTITY_FIELDS = ('users', 'groups', 'fsso-groups')    # a policy with any of them only matches those users
+# settings that change what a policy matches in a way the ranges do not show
+UNCOMPARABLE_FIELDS = ('srcaddr-negate', 'dstaddr-negate', 'service-negate', 'internet-service',
+                       'internet-service-src')
+# fields that do not change what a policy matches, left out when looking for duplicates
+IGNORED_FIELDS = ('id', 'uuid', 'name', 'comments', 'srcsubnet', 'dstsubnet', 'service_ports')
+MERGE_FIELDS = {'srcaddr': 'srcaddr-negate', 'dstaddr': 'dstaddr-negate', 'service': 'service-negate'}
+
+
+class PolicyShape:
+    """ What one policy matches, in a form that can be compared.
+        context is (srcintf, dstintf, schedule, users, groups, fsso groups), src, dst and ports are
+        (merged ranges, names without range) where the names are fqdn, country... or services without ports.
+    """
+    __slots__ = ('number', 'record', 'context', 'src', 'dst', 'ports', 'comparable')
+
+    def __init__(self, number, record, objects, services, vdom_name, resolved=None):
+        """
+        Parameters:
+            resolved (dict): values already resolved for other policies, member lists are often repeated.
+        """
+        self.number = number
+        self.record = record
+        self.context = tuple(_names(record, field) for field in ('srcintf', 'dstintf', 'schedule') + IDENTITY_FIELDS)
+        if resolved is None:
+            resolved = dict()
+        self.src = _resolved(resolved, objects, record.get('srcsubnet', []), vdom_name)
+        self.dst = _resolved(resolved, objects, record.get('dstsubnet', []), vdom_name)
+        if ANY_SERVICE in _names(record, 'service'):
+            self.ports = ((ALL_SERVICES,), frozenset())
+        else:
+            self.ports = _resolved(resolved, services, record.get('service_ports', []), vdom_name)
+        self.comparable = (not any(_enabled(record, field) for field in UNCOMPARABLE_FIELDS) and
+                           all(ranges or texts for ranges, texts in (self.src, self.dst, self.ports)))
+
+
+def _resolved(resolved: dict, resolver, members: list, vdom_name: str) -> tuple:
+    """ (merged ranges, names) of the members.
+    """
+    key = (id(resolver), vdom_name, tuple(members))
+    value = resolved.get(key)
+    if value is None:
+        ranges, texts = resolver.ranges(members, vdom_name)
+        value = resolved[key] = (tuple(ranges), frozenset(texts))
+    return value
+
+
+def _names(record: dict, field: str) -> frozenset:
+    value = record.get(field, '').strip()
+    return frozenset(split_values(value)) if value else frozenset()
+
+
+def _enabled(record: dict, field: str) -> bool:
+    return record.get(field, '').strip() == 'enable'
+
+
+def _covers_context(outer: tuple, inner: tuple) -> bool:
+    """ Interfaces, schedule and users/groups of a policy cover those of another.
+    """
+    srcintf, dstintf, schedule = outer[:3]
+    if not ((ANY_INTERFACE in srcintf or inner[0] <= srcintf) and (ANY_INTERFACE in dstintf or inner[1] <= dstintf)
+            and (ANY_SCHEDULE in schedule or inner[2] == schedule)):
+        return False
+    if not any(outer[3:]):
+        return True     # matches every user
+    # a policy without users/groups matches users the other one does not, a user of a group is not looked up
+    return any(inner[3:]) and all(names <= outer_names for names, outer_names in zip(inner[3:], outer[3:]))
+
+
+def _covers_ranges(outer: list, inner: list) -> bool:
+    """ Both lists are merged ranges (see addresses.merge_ranges).
+    """
+    starts = [start for start, end in outer]
+    for start, end in inner:
+        position = bisect_right(starts, start) - 1
+        if position < 0 or outer[position][1] < end:
+            return False
+    return True
+
+
+def _covers_value(outer: tuple, inner: tuple, everything: tuple) -> bool:
+    """ A (merged ranges, names) value covers another: each range of the other is inside one of its ranges and it
+        holds all the names of the other, or it starts with everything (e.g. 0.0.0.0/0), which also covers names.
+    """
+    ranges, texts = outer
+    return ranges[:1] == (everything,) or inner[1] <= texts and _covers_ranges(ranges, inner[0])
+
+
+class _ValueIndex:
+    """ Distinct values of one field of a group of policies, finds the values covering a value (see _covers_value).
+    """
+
+    def __init__(self, values: dict, everything: tuple, firsts: dict):
+        """
+        Parameters:
+            values (dict): value number to (merged ranges, names).
+            everything (tuple): range of a value that also covers every name.
+            firsts (dict): value number to the position of the first policy with it.
+        """
+        self.firsts = firsts
+        self.index = IntervalIndex((start, end, (number, end)) for number, (ranges, texts) in values.items()
+                                   for start, end in ranges)
+        self.wildcards = frozenset(number for number, (ranges, texts) in values.items()
+                                   if ranges[:1] == (everything,))
+        self.by_text = dict()   # name to the values holding it
+        for number, (ranges, texts) in values.items():
+            for text in texts:
+                self.by_text.setdefault(text, set()).add(number)
+        self.holding = dict()   # range to the values with a range around it, many values share a range
+        self.found = dict()
+        self.orders = dict()
+
+    def covering(self, number: int, value: tuple) -> frozenset:
+        """ Numbers of the values covering value, value is number in the values of the whole vdom.
+        """
+        found = self.found.get(number)
+        if found is not None:
+            return found
+        ranges, texts = value
+        holding = self.holding
+        sets = []
+        for start, end in ranges:
+            holders = holding.get((start, end))
+            if holders is None:
+                holders = holding[(start, end)] = frozenset(outer for outer, outer_end in self.index.stab(start)
+                                                            if outer_end >= end)
+            sets.append(holders)
+        for text in texts:
+            sets.append(self.by_text.get(text, frozenset()))
+        sets.sort(key=len)  # each intersection goes through the smaller set
+        found = sets[0].intersection(*sets[1:])
+        if self.wildcards:
+            found |= self.wildcards
+        self.found[number] = found
+        return found
+
+    def ordered(self, number: int) -> list:
+        """ Values covering value number by the position of their first policy, once covering() was called.
+        """
+        ordered = self.orders.get(number)
+        if ordered is None:
+            ordered = self.orders[number] = sorted(self.found[number], key=self.firsts.__getitem__)
+        return ordered
+
+
+class _ContextPolicies:
+    """ Policies of one context (interfaces, schedule and users/groups), by source and by destination.
+    """
+
+    def __init__(self, keys: list, positions: list, values: tuple):
+        """
+        Parameters:
+            keys (list): (src, dst, ports) value numbers of every policy of the vdom.
+            positions (list): positions of the policies of the context in config order.
+            values (tuple): distinct source, destination and port values of the vdom.
+        """
+        by_src = dict()     # src to (dst, ports) to the first policy with them
+        by_dst = dict()     # dst to (src, ports) to the first policy with them
+        for position in positions:
+            src, dst, ports = keys[position]
+            by_src.setdefault(src, dict()).setdefault((dst, ports), position)
+            by_dst.setdefault(dst, dict()).setdefault((src, ports), position)
+        # (position, other address, ports) in config order, so a lookup stops at the first one covering
+        self.by_src = {src: [(position, dst, ports) for (dst, ports), position in earlier.items()]
+                       for src, earlier in by_src.items()}
+        self.by_dst = {dst: [(position, src, ports) for (src, ports), position in earlier.items()]
+                       for dst, earlier in by_dst.items()}
+        self.src_counts = {src: len(earlier) for src, earlier in self.by_src.items()}
+        self.dst_counts = {dst: len(earlier) for dst, earlier in self.by_dst.items()}
+        sources, destinations, services = values
+        self.sources = _ValueIndex({number: sources[number] for number in by_src}, ALL_ADDRESSES,
+                                   {src: earlier[0][0] for src, earlier in self.by_src.items()})
+        self.destinations = _ValueIndex({number: destinations[number] for number in by_dst}, ALL_ADDRESSES,
+                                        {dst: earlier[0][0] for dst, earlier in self.by_dst.items()})
+
+    def first_covering(self, key: tuple, values: tuple, covers_ports, before: int) -> int:
+        """ Position of the first policy covering the source, destination and ports of key, before if there is
+            none earlier. The earlier policies are looked up from the covering sources or from the covering
+            destinations, whichever leads to fewer of them.
+        """
+        src, dst, ports = key
+        covering_src = self.sources.covering(src, values[0][src])
+        if not covering_src:
+            return before
+        covering_dst = self.destinations.covering(dst, values[1][dst])
+        if not covering_dst:
+            return before
+        # every value has at least one policy, so a side costing less than the number of values of the other wins
+        if len(covering_src) <= len(covering_dst):
+            cost = sum(map(self.src_counts.__getitem__, covering_src))
+            use_src = cost <= len(covering_dst) or cost <= sum(map(self.dst_counts.__getitem__, covering_dst))
+        else:
+            cost = sum(map(self.dst_counts.__getitem__, covering_dst))
+            use_src = not (cost <= len(covering_src) or cost <= sum(map(self.src_counts.__getitem__, covering_src)))
+        if use_src:
+            lookups, numbers, others = self.by_src, self.sources.ordered(src), covering_dst
+        else:
+            lookups, numbers, others = self.by_dst, self.destinations.ordered(dst), covering_src
+        found = before
+        for number in numbers:
+            earlier = lookups[number]
+            if earlier[0][0] >= found:
+                break   # the next values only have later policies
+            for position, other, outer_ports in earlier:
+                if position >= found:
+                    break
+                if other in others and covers_ports(outer_ports, ports):
+                    found = position
+                    break
+        return found
+
+
+def _action(shape: PolicyShape) -> str:
+    return shape.record.get('action', 'deny').strip() or 'deny'   # deny is the default action
+
+
+def _policy_id(shape: PolicyShape) -> str:
+    return shape.record.get('id', '')
+
+
+def find_covering(shapes: list) -> list:
+    """ Shadowed and redundant policies of one vdom, shapes in config order.
+    Returns:
+        findings (list): (shape, finding, first earlier shape covering it).
+    """
+    shapes = [shape for shape in shapes if shape.comparable]
+    numbers = (dict(), dict(), dict())  # distinct source, destination and port values to their number
+    keys = [tuple(field_numbers.setdefault(value, len(field_numbers)) for field_numbers, value in
+                  zip(numbers, (shape.src, shape.dst, shape.ports))) for shape in shapes]
+    values = tuple(list(field_numbers) for field_numbers in numbers)
+    port_covers = dict()
+
+    def covers_ports(outer: int, inner: int) -> bool:
+        covers = port_covers.get((outer, inner))
+        if covers is None:
+            covers = port_covers[(outer, inner)] = _covers_value(values[2][outer], values[2][inner], ALL_SERVICES)
+        return covers
+
+    by_context = dict()     # context to the positions of its policies
+    for position, shape in enumerate(shapes):
+        by_context.setdefault(shape.context, []).append(position)
+    contexts = {context: _ContextPolicies(keys, positions, values) for context, positions in by_context.items()}
+    covering_contexts = {context: [contexts[outer] for outer in contexts if _covers_context(outer, context)]
+                         for context in contexts}
+    findings = []
+    for position, shape in enumerate(shapes):
+        found = position
+        for policies in covering_contexts[shape.context]:
+            found = policies.first_covering(keys[position], values, covers_ports, found)
+        if found < position:
+            earlier = shapes[found]
+            finding = 'redundant' if _action(earlier) == _action(shape) else 'shadowed'
+            findings.append((shape, finding, earlier))
+    return findings
+
+
+def find_mergeable(shapes: list) -> list:
+    """ Duplicate and mergeable policies of one vdom, shapes in config order.
+    Returns:
+        findings (list): (shape, finding, earlier shape, field that differs or '').
+    """
+    findings = []
+    reported = set()
+    first_seen = dict()
+    for shape in shapes:
+        fields = {name: value for name, value in shape.record.items() if name not in IGNORED_FIELDS}
+        key = tuple(sorted(fields.items()))
+        if key in first_seen:
+            findings.append((shape, 'duplicate', first_seen[key], ''))
+            reported.add(shape.number)
+        else:
+            first_seen[key] = shape
+    for field, negate in MERGE_FIELDS.items():
+        first_seen = dict()
+        for shape in shapes:
+            if shape.number in reported or _enabled(shape.record, negate):
+                continue    # merging two negated lists does not give the union of what they match
+            key = tuple(sorted((name, value) for name, value in shape.record.items()
+                               if name not in IGNORED_FIELDS and name != field))
+            if key in first_seen:
+                findings.append((shape, 'mergeable', first_seen[key], field))
+                reported.add(shape.number)
+            else:
+                first_seen[key] = shape
+    return findings
+
+
+def analyse_config(config) -> list:
+    """ Findings of the IPv4 policies of every vdom of a parsed config.
+    Returns:
+        rows (list): dict rows with the FINDING_COLUMNS.
+    """
+    columns, policies = get_policies(config, (POLICY_TABLE,))
+    objects = get_object_table(config)
+    services = get_service_table(config)
+    by_vdom = dict()
+    resolved = dict()
+    for number, record in enumerate(policies):
+        if record.get('status', '').strip() == 'disable':
+            continue    # a disabled policy matches nothing
+        vdom_name = record.get('vdom', DEFAULT_VDOM)
+        by_vdom.setdefault(vdom_name, []).append(PolicyShape(number, record, objects, services, vdom_name,
+                                                             resolved))
+    rows = []
+    for vdom_name, shapes in by_vdom.items():
+        # one finding per policy: duplicate, else shadowed/redundant, else mergeable
+        findings = dict()
+        for shape, finding, earlier, field in find_mergeable(shapes):
+            findings[shape.number] = (finding, earlier, field)
+        for shape, finding, earlier in find_covering(shapes):
+            if findings.get(shape.number, ('',))[0] != 'duplicate':
+                findings[shape.number] = (finding, earlier, '{} by {} policy'.format(_action(shape), _action(earlier)))
+        for number in sorted(findings):
+            finding, earlier, detail = findings[number]
+            rows.append({'vdom': vdom_name, 'id': policies[number].get('id', ''), 'finding': finding,
+                         'by': _policy_id(earlier), 'detail': detail})
+    return rows
+
+
+def write_findings(output_file: str, backup_file: str, vdom_filter: str = None, use_index: bool = False,
+                   output_format: str = 'csv') -> dict:
+    """ Analyse the backup file, or only the sections of one vdom, and write the findings to a csv file,
+        or to a file of another output format.
+    Returns:
+        counts (dict): finding to number of policies.
+    """
+    if vdom_filter is None and not use_index:
+        configs = [parse_config(backup_file)]
+    else:
+        configs = (parse_config(backup_file, start, end)
+                   for name, start, end in load_index(backup_file, use_index).sections(vdom_filter))
+    counts = dict()
+    with open_writer(output_file, ColumnRegistry(FINDING_COLUMNS), '', output_format) as writer:
+        writer.write_header()
+        for config in configs:
+            for row in analyse_config(config):
+                writer.write(row)
+                counts[row['finding']] = counts.get(row['finding'], 0) + 1
+    return counts
@@ -0,0 +1,71 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Library entry points, to export the policies from another program without going through the command line:
+#   config = parse('backup.conf')
+#   objects = resolve_objects(config)
+#   export_policies(config, 'policies.csv')
+# Nothing is kept between two calls, one process can export any number of backup files.
+
+import csv
+import os
+
+from fwpolicy.export import merge_columns, write_policies
+from fwpolicy.objects import ObjectResolver, get_object_table
+from fwpolicy.parser import export_config
+from fwpolicy.services import ServiceResolver, get_service_table
+from fwpolicy.tree import Config, parse_config
+from fwpolicy.writer import ExportDialect, PolicyWriter, open_writer
+
+
+def parse(path: str, progress=None) -> Config:
+    """ Read a backup config from the FortiGate.
+    Parameters:
+        path (str): backup config file.
+        progress: called with (vdom, line number) while the file is read, None for no progress.
+    Returns:
+        config (Config): tree of the vdoms, tables and entries of the file.
+    """
+    return parse_config(path, progress=progress)
+
+
+def resolve_objects(config: Config) -> ObjectResolver:
+    """ Subnets of every address/vip object and group of the config.
+        resolver.items() gives (vdom, object, subnets), resolver.resolve(members, vdom) the subnets of a policy
+        field and resolver.cycles the groups found in a loop.
+    """
+    return get_object_table(config)
+
+
+def resolve_services(config: Config) -> ServiceResolver:
+    """ Protocol/port ranges of every service object and group of the config, see resolve_objects.
+    """
+    return get_service_table(config)
+
+
+def export_policies(config: Config, sink, output_format: str = 'csv') -> int:
+    """ Write the policies of the config with their subnets and ports resolved.
+    Parameters:
+        config (Config): parsed backup config, see parse.
+        sink: output file name, or a text file opened by the caller, which is left open.
+        output_format (str): one of writer.OUTPUT_FORMATS, only 'csv' and 'excel' can be written to an opened file.
+    Returns:
+        hit (int): number of policies written.
+    """
+    results = [export_config(config)]
+    columns = merge_columns(results)
+    try:
+        if isinstance(sink, (str, os.PathLike)):
+            with open_writer(os.fspath(sink), columns, output_format=output_format) as writer:
+                writer.write_header()
+                return write_policies(writer, results)
+        if output_format == 'excel':
+            writer = PolicyWriter(sink, columns, '', csv.excel)
+        elif output_format == 'csv':
+            writer = PolicyWriter(sink, columns, dialect=ExportDialect)
+        else:
+            raise ValueError('{} output needs a file name'.format(output_format))
+        writer.write_header()
+        return write_policies(writer, results)
+    finally:
+        results[0].policies.close()
@@ -0,0 +1,141 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Batch export of many backup files: each file is exported by one process of a bounded pool, so a fleet of
+# devices is done in one run instead of one interpreter per device.
+# Each device is named after its backup file. Backups with the same file name in different folders (a glob such as
+# 'backups/*/fw.conf') get the folders that tell them apart, so no worker overwrites the output of another.
+
+import glob
+import os.path
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fwpolicy.export import export_results, merge_columns, write_csv, write_policies
+from fwpolicy.parser import FIXED_COLUMNS
+from fwpolicy.writer import FORMAT_SUFFIXES, ColumnRegistry, open_writer
+
+BACKUP_PATTERN = '*.conf'   # backup files taken from a folder
+
+
+def find_backups(source: str) -> list:
+    """ Backup files of a folder (*.conf) or matching a glob pattern, sorted by name.
+    """
+    if os.path.isdir(source):
+        source = os.path.join(source, BACKUP_PATTERN)
+    return sorted(path for path in glob.glob(source) if os.path.isfile(path))
+
+
+def device_names(backup_files: list) -> dict:
+    """ Device name used for the output file and the 'device' column: the backup file name without extension,
+        with its parent folders joined by '-' in front ('site1-fw', 'site2-fw') as far as needed to be unique.
+        Names are compared ignoring case, like the output files are on Windows.
+    Returns:
+        names (dict): backup file to device name.
+    """
+    parts = {backup_file: [part for part in os.path.splitext(os.path.abspath(backup_file))[0].split(os.sep) if part]
+             for backup_file in backup_files}
+    depth = dict.fromkeys(backup_files, 1)
+    while True:
+        names = {backup_file: '-'.join(parts[backup_file][-depth[backup_file]:]) for backup_file in backup_files}
+        files_by_name = dict()
+        for backup_file, name in names.items():
+            files_by_name.setdefault(name.lower(), []).append(backup_file)
+        longer = [backup_file for same_name in files_by_name.values()
+                  if len({tuple(parts[backup_file]) for backup_file in same_name}) > 1
+                  for backup_file in same_name if depth[backup_file] < len(parts[backup_file])]
+        if not longer:
+            break
+        for backup_file in longer:
+            depth[backup_file] += 1
+    for same_name in files_by_name.values():   # the same file listed twice, numbered from the second one
+        for number, backup_file in enumerate(same_name[1:], 2):
+            names[backup_file] += '-{}'.format(number)
+    return names
+
+
+def export_device(backup_file: str, output_folder: str, cache_dir: str = None, output_format: str = 'csv',
+                  device: str = None) -> tuple:
+    """ Export one backup file to <output_folder>/<device>.csv (or the suffix of the output format), used by
+        the pool workers.
+    Parameters:
+        device (str): name of the output file, see device_names, None for the backup file name.
+    Returns:
+        summary (tuple): (backup file, number of policies, seconds, error message or None).
+    """
+    started = time.perf_counter()
+    try:
+        results, cached = export_results(backup_file, cache_dir=cache_dir)
+        if device is None:
+            device = device_names([backup_file])[backup_file]
+        hit = write_csv(os.path.join(output_folder, device + FORMAT_SUFFIXES[output_format]), results, output_format)
+    except (IOError, UnicodeDecodeError) as e:
+        return backup_file, 0, time.perf_counter() - started, str(e)
+    return backup_file, hit, time.perf_counter() - started, None
+
+
+def parse_device(backup_file: str, cache_dir: str = None) -> tuple:
+    """ Parse one backup file for a combined export, used by the pool workers.
+    Returns:
+        summary (tuple): (backup file, results, seconds, error message or None).
+    """
+    started = time.perf_counter()
+    try:
+        results, cached = export_results(backup_file, cache_dir=cache_dir)
+    except (IOError, UnicodeDecodeError) as e:
+        return backup_file, [], time.perf_counter() - started, str(e)
+    return backup_file, results, time.perf_counter() - started, None
+
+
+def run_batch(backup_files: list, output: str, jobs: int = 1, combine: bool = False, cache_dir: str = None,
+              output_format: str = 'csv') -> list:
+    """ Export the backup files with a pool of jobs processes.
+    Parameters:
+        backup_files (list): backup config files.
+        output (str): output folder, or the csv file when combine is set.
+        jobs (int): number of processes.
+        combine (bool): write one csv with a 'device' column instead of one csv per device.
+        cache_dir (str): folder of the results cache, None to always parse.
+        output_format (str): format of the output files, see writer.py.
+    Returns:
+        summary (list): (backup file, number of policies, seconds, error message or None) in file order.
+    """
+    count = len(backup_files)
+    names = device_names(backup_files)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        if not combine:
+            os.makedirs(output, exist_ok=True)
+            return list(pool.map(export_device, backup_files, [output] * count, [cache_dir] * count,
+                                 [output_format] * count, [names[backup_file] for backup_file in backup_files]))
+
+        parsed = list(pool.map(parse_device, backup_files, [cache_dir] * count))
+    # columns of every device are known once all files are parsed, rows are written in file order
+    columns = ColumnRegistry(['device'] + FIXED_COLUMNS)
+    for backup_file, results, seconds, error in parsed:
+        merge_columns(results, columns)
+    summary = []
+    with open_writer(output, columns, output_format=output_format) as writer:
+        writer.write_header()
+        for backup_file, results, seconds, error in parsed:
+            hit = write_policies(writer, results, names[backup_file])
+            summary.append((backup_file, hit, seconds, error))
+    return summary
+
+
+def print_summary(summary: list, elapsed: float):
+    """ Print the time taken by each file and the total.
+    """
+    names = device_names([backup_file for backup_file, hit, seconds, error in summary])
+    width = max([len(name) for name in names.values()] + [6])
+    print('{:<{}}  {:>8}  {:>8}'.format('device', width, 'policies', 'seconds'))
+    failed = 0
+    for backup_file, hit, seconds, error in summary:
+        print('{:<{}}  {:>8}  {:>8.2f}'.format(names[backup_file], width, hit, seconds), end='')
+        if error is None:
+            print()
+        else:
+            failed += 1
+            print('  Error: {}'.format(error))
+    print('*' * 60)
+    print("Results: {} files, {} policies, {} failed, {:.2f} seconds".format(
+        len(summary), sum(hit for backup_file, hit, seconds, error in summary), failed, elapsed))
@@ -0,0 +1,126 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Compact store of the policy records between the parsing and the output.
+# The columns are only known once the whole backup has been read, so the rows are kept until the header can be
+# written. A record is kept as a flat tuple (field id, value, field id, value, ...) of the fields it sets
+# instead of a dict, equal values are shared between the rows, and once the rows held take about SPILL_BYTES of
+# memory they are moved to a temporary file. The size counts the row tuples and each distinct value once, the
+# resolved srcsubnet/dstsubnet texts make most of it. A buffer unpickled from a worker process or from the cache
+# is spilled the same way, and so is a finished buffer of a vdom section (see export.py), so the buffers of many
+# sections do not add up in memory.
+
+import pickle
+
+from fwpolicy.writer import ColumnRegistry
+
+SPILL_BYTES = 8 << 20   # approximate size of the rows kept in memory, the older ones go to the temporary file
+ROW_BYTES = 56      # size of a row tuple without its items, 8 bytes are added per item
+VALUE_BYTES = 49    # size of a str without its characters
+PICKLE_PROTOCOL = 5
+
+
+class PolicyBuffer:
+    """ Policy records in the order they were added. Iterating gives the records back as dicts.
+    """
+
+    def __init__(self, spill_bytes: int = SPILL_BYTES):
+        self.fields = ColumnRegistry()  # field name to field id, every field of the records
+        self.rows = []
+        self.values = dict()    # one copy of each value, e.g. 'accept ' is held once for all the rows
+        self.spill_bytes = spill_bytes
+        self.held = 0   # approximate bytes of the rows and values in memory
+        self.spill_file = None  # temporary file of the spilled rows, one pickled chunk per spill
+        self.spilled = 0    # number of rows in the temporary file
+        self.chunks = 0
+
+    def append(self, record: dict):
+        add = self.fields.add
+        row = []
+        for name, value in record.items():
+            row.append(add(name))
+            row.append(value)
+        self._hold(row)
+
+    def _hold(self, row: list):
+        """ Keep a row in memory with its values shared, spill the rows once they reach spill_bytes.
+        """
+        values = self.values
+        size = ROW_BYTES + 8 * len(row)
+        for position in range(1, len(row), 2):
+            value = row[position]
+            kept = values.get(value)
+            if kept is None:
+                values[value] = value
+                size += VALUE_BYTES + len(value)
+            else:
+                row[position] = kept
+        self.rows.append(tuple(row))
+        self.held += size
+        if self.held >= self.spill_bytes:
+            self.spill()
+
+    def spill(self):
+        """ Move the rows held in memory to the temporary file.
+        """
+        if not self.rows:
+            return
+        if self.spill_file is None:
+            import tempfile
+            self.spill_file = tempfile.TemporaryFile()
+        self.spill_file.seek(0, 2)
+        pickle.dump(self.rows, self.spill_file, protocol=PICKLE_PROTOCOL)
+        self.spilled += len(self.rows)
+        self.chunks += 1
+        self.rows = []
+        self.values.clear()
+        self.held = 0
+
+    def _iter_rows(self):
+        if self.spill_file is not None:
+            self.spill_file.seek(0)
+            for chunk in range(self.chunks):
+                yield from pickle.load(self.spill_file)
+        yield from self.rows
+
+    def __iter__(self):
+        names = self.fields.names
+        for row in self._iter_rows():
+            yield {names[row[position]]: row[position + 1] for position in range(0, len(row), 2)}
+
+    def __len__(self):
+        return self.spilled + len(self.rows)
+
+    def close(self):
+        """ Remove the temporary file.
+        """
+        if self.spill_file is not None:
+            self.spill_file.close()
+            self.spill_file = None
+
+    def __getstate__(self):
+        """ Pickled with its spilled chunks as they are in the temporary file, e.g. for the cache or from a worker
+            process, only the rows held in memory are pickled as rows.
+        """
+        spilled_chunks = b''
+        if self.spill_file is not None:
+            self.spill_file.seek(0)
+            spilled_chunks = self.spill_file.read()
+        return self.fields.names, spilled_chunks, self.chunks, self.spilled, self.rows, self.spill_bytes
+
+    def __setstate__(self, state):
+        """ An unpickled buffer is complete, nothing is appended to it, so all its rows go back to a temporary file.
+        """
+        names, spilled_chunks, chunks, spilled, rows, spill_bytes = state
+        self.__init__(spill_bytes)
+        for name in names:
+            self.fields.add(name)
+        if chunks:
+            import tempfile
+            self.spill_file = tempfile.TemporaryFile()
+            self.spill_file.write(spilled_chunks)
+            self.chunks = chunks
+            self.spilled = spilled
+        for row in rows:
+            self._hold(list(row))
+        self.spill()
@@ -0,0 +1,100 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# On disk cache of the parsed export results.
+# The key is made of the content hash of the backup file, the parser version and the export options, so a cache
+# entry is never used for a changed backup file or after the parser code changed.
+# An entry that can not be read back, or is not what the caller expects, is deleted and parsed again.
+
+import glob
+import hashlib
+import os
+import os.path
+import pickle
+import tempfile
+
+CACHE_SUFFIX = '.pickle'
+PICKLE_PROTOCOL = 5
+CHUNK_SIZE = 1 << 20
+
+_parser_version = None
+
+
+def file_digest(infile: str) -> str:
+    """ sha256 of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(infile, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parser_version() -> str:
+    """ Hash of the fwpolicy sources, any change of the parser gives a new version.
+    """
+    global _parser_version
+    if _parser_version is None:
+        digest = hashlib.sha256()
+        for source in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+            with open(source, 'rb') as source_file:
+                digest.update(source_file.read())
+        _parser_version = digest.hexdigest()
+    return _parser_version
+
+
+def cache_key(infile: str, *options) -> str:
+    """ Key of the export of infile with the given options.
+    """
+    digest = hashlib.sha256(file_digest(infile).encode())
+    digest.update(parser_version().encode())
+    for option in options:
+        digest.update(b'\0' + repr(option).encode())
+    return digest.hexdigest()
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def load(cache_dir: str, key: str, valid=None):
+    """ Cached value of key, None when there is none.
+    Parameters:
+        valid: called with the value, returns False when it is not what the caller stored, None to take any value.
+    Returns:
+        value, or None when the entry is missing, damaged or not valid. A damaged or not valid entry is deleted.
+    """
+    cache_name = os.path.join(cache_dir, key + CACHE_SUFFIX)
+    try:
+        with open(cache_name, 'rb') as cache_file:
+            value = pickle.load(cache_file)
+        if valid is None or valid(value):
+            return value
+    except FileNotFoundError:
+        return None
+    except Exception:   # truncated, garbage or made by other classes, any error of unpickling means a miss
+        pass
+    _remove(cache_name)
+    return None
+
+
+def save(cache_dir: str, key: str, value):
+    """ Store value under key. The file is written under a temporary name first so a concurrent run never
+        reads half of it, the temporary file is removed when the write fails.
+    """
+    temp_name = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_name = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as cache_file:
+            pickle.dump(value, cache_file, protocol=PICKLE_PROTOCOL)
+        os.replace(temp_name, os.path.join(cache_dir, key + CACHE_SUFFIX))
+        temp_name = None
+    except OSError as e:
+        print("Warning: cannot write cache in {} - {}".format(cache_dir, e.strerror))
+    finally:
+        if temp_name is not None:
+            _remove(temp_name)
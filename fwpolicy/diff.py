@@ -0,0 +1,129 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Differences between two backups of the same device.
+# Each policy is fingerprinted under its uuid (vdom/id when it has none) and each address object under its
+# vdom and name. Only the added, removed and modified policies/objects are written, one row per field.
+# Fingerprints are kept in the cache so the old backup of a daily diff is not parsed again.
+
+import hashlib
+
+from fwpolicy import cache
+from fwpolicy.export import export_results
+from fwpolicy.writer import ColumnRegistry, open_writer
+
+DIFF_COLUMNS = ['change', 'type', 'vdom', 'name', 'uuid', 'field', 'old', 'new']
+FINGERPRINT_OPTION = 'fingerprints'     # cache key option of the fingerprints
+
+
+class Fingerprints:
+    """ Fingerprints of the policies and address objects of one backup.
+    """
+    __slots__ = ('policies', 'objects')
+
+    def __init__(self):
+        self.policies = dict()  # uuid or vdom/id to (digest, policy record)
+        self.objects = dict()   # (vdom, object) to subnets
+
+
+def record_digest(record: dict) -> bytes:
+    """ Short digest of the fields of a policy, two policies with the same fields have the same digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(record):
+        digest.update(name.encode() + b'\0' + str(record[name]).encode() + b'\0')
+    return digest.digest()
+
+
+def policy_key(record: dict) -> str:
+    uuid = record.get('uuid')
+    if uuid:
+        return uuid
+    return '{}/{}'.format(record.get('vdom', ''), record.get('id', ''))
+
+
+def fingerprint_results(results: list) -> Fingerprints:
+    """ Fingerprints of the export results of one backup, see export.export_results.
+    """
+    fingerprints = Fingerprints()
+    for result in results:
+        for record in result.policies:
+            fingerprints.policies[policy_key(record)] = (record_digest(record), record)
+        for vdom, name, subnets in result.objects:
+            fingerprints.objects[vdom, name] = subnets
+    return fingerprints
+
+
+def load_fingerprints(backup_file: str, jobs: int = 1, cache_dir: str = None) -> Fingerprints:
+    """ Fingerprints of a backup file, taken from the cache when this content was fingerprinted before.
+    """
+    if cache_dir is not None:
+        key = cache.cache_key(backup_file, FINGERPRINT_OPTION)
+        fingerprints = cache.load(cache_dir, key, lambda value: isinstance(value, Fingerprints))
+        if fingerprints is not None:
+            return fingerprints
+    results, cached = export_results(backup_file, jobs)
+    fingerprints = fingerprint_results(results)
+    if cache_dir is not None:
+        cache.save(cache_dir, key, fingerprints)
+    return fingerprints
+
+
+def diff_fingerprints(old: Fingerprints, new: Fingerprints):
+    """ Differences from old to new.
+    Returns:
+        generator of dict rows with the DIFF_COLUMNS: 'added' and 'removed' give every field of the policy or
+        object, 'modified' gives only the fields that changed.
+    """
+    for key, (digest, record) in new.policies.items():
+        if key not in old.policies:
+            yield from _field_rows('added', key, record, {}, record)
+        elif old.policies[key][0] != digest:
+            old_record = old.policies[key][1]
+            yield from _field_rows('modified', key, record, old_record, record)
+    for key, (digest, record) in old.policies.items():
+        if key not in new.policies:
+            yield from _field_rows('removed', key, record, record, {})
+
+    for key, subnets in new.objects.items():
+        if key not in old.objects:
+            yield _object_row('added', key, '', subnets)
+        elif old.objects[key] != subnets:
+            yield _object_row('modified', key, old.objects[key], subnets)
+    for key, subnets in old.objects.items():
+        if key not in new.objects:
+            yield _object_row('removed', key, subnets, '')
+
+
+def _field_rows(change: str, key: str, record: dict, old_record: dict, new_record: dict):
+    for field in dict.fromkeys(list(old_record) + list(new_record)):
+        if field in ('vdom', 'uuid') or (field == 'id' and change != 'modified'):
+            continue    # already in the vdom/name/uuid columns
+        old_value = old_record.get(field, '')
+        new_value = new_record.get(field, '')
+        if old_value != new_value:
+            yield {'change': change, 'type': 'policy', 'vdom': record.get('vdom', ''), 'name': record.get('id', ''),
+                   'uuid': record.get('uuid', ''), 'field': field, 'old': old_value, 'new': new_value}
+
+
+def _object_row(change: str, key: tuple, old_value: str, new_value: str) -> dict:
+    return {'change': change, 'type': 'object', 'vdom': key[0], 'name': key[1], 'uuid': '', 'field': 'subnets',
+            'old': old_value, 'new': new_value}
+
+
+def write_diff(output_file: str, old: Fingerprints, new: Fingerprints, output_format: str = 'csv') -> dict:
+    """ Write the differences to a csv file, or to a file of another output format.
+    Returns:
+        counts (dict): (type, change) to number of policies/objects.
+    """
+    counts = dict()
+    seen = set()
+    with open_writer(output_file, ColumnRegistry(DIFF_COLUMNS), '', output_format) as writer:
+        writer.write_header()
+        for row in diff_fingerprints(old, new):
+            writer.write(row)
+            item = (row['type'], row['change'], row['vdom'], row['name'], row['uuid'])
+            if item not in seen:
+                seen.add(item)
+                counts[row['type'], row['change']] = counts.get((row['type'], row['change']), 0) + 1
+    return counts
@@ -0,0 +1,111 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Export of one backup file: parse it (from the cache, by vdom section or in parallel) and write the policy csv.
+
+from fwpolicy.index import load_index
+from fwpolicy.parser import FIXED_COLUMNS, SectionExport, export_section
+from fwpolicy.writer import ColumnRegistry, PolicyWriter, open_writer
+
+
+def export_results(backup_file: str, jobs: int = 1, vdom_filter: str = None, use_index: bool = False,
+                   cache_dir: str = None, progress=None) -> tuple:
+    """ Parse the backup file and resolve its policies.
+    Parameters:
+        backup_file (str): backup config file from the FortiGate.
+        jobs (int): number of processes exporting the vdom sections.
+        vdom_filter (str): export only this vdom, None for all of them.
+        use_index (bool): keep the offset index in a sidecar file next to the backup.
+        cache_dir (str): folder of the results cache, None to always parse.
+        progress: called with (vdom, line number) while the file is read, e.g. a ProgressReporter (see stats.py).
+    Returns:
+        results (list): SectionExport of each section, in file order.
+        cached (bool): True when the results come from the cache.
+    """
+    if cache_dir is not None:
+        from fwpolicy import cache
+        key = cache.cache_key(backup_file, vdom_filter)
+        results = cache.load(cache_dir, key, valid_results)
+        if results is not None:
+            return results, True
+    if jobs > 1 or vdom_filter is not None or use_index:
+        sections = load_index(backup_file, use_index).sections(vdom_filter)
+        if jobs > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            results = []
+            lines = 0
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for (name, start, end), result in zip(sections, pool.map(
+                        export_section, [backup_file] * len(sections), [start for name, start, end in sections],
+                        [end for name, start, end in sections])):
+                    results.append(result)
+                    lines += result.lines
+                    if progress is not None:    # reported as the sections come back, in file order
+                        progress(name, lines)
+        else:
+            results = []
+            for name, start, end in sections:
+                result = export_section(backup_file, start, end, progress)
+                result.policies.spill()     # the section is finished, its rows wait on disk for the header
+                results.append(result)
+    else:
+        results = [export_section(backup_file, progress=progress)]
+    if cache_dir is not None:
+        cache.save(cache_dir, key, results)
+    return results, False
+
+
+def valid_results(value) -> bool:
+    """ True for what export_results stores in the cache.
+    """
+    return isinstance(value, list) and all(isinstance(result, SectionExport) for result in value)
+
+
+def merge_columns(results: list, columns: ColumnRegistry = None) -> ColumnRegistry:
+    """ Columns of all results, in the order they first appear.
+    """
+    if columns is None:
+        columns = ColumnRegistry(FIXED_COLUMNS)
+    for result in results:
+        for field in result.columns:
+            columns.add(field)
+    return columns
+
+
+def write_policies(writer: PolicyWriter, results: list, device: str = None) -> int:
+    """ Write the policy rows of the results.
+    Parameters:
+        writer (PolicyWriter): writer of the output file, see writer.open_writer.
+        results (list): SectionExport of each section.
+        device (str): value of the 'device' column, None when the output has no such column.
+    Returns:
+        hit (int): number of policies written.
+    """
+    hit = 0
+    for result in results:
+        for policy in result.policies:
+            if device is not None:
+                policy['device'] = device
+            writer.write(policy)
+            hit += 1
+    return hit
+
+
+def write_object_subnets(output_file: str, results: list):
+    """ Write the subnets of every object, one 'vdom-object:subnets' line per object.
+    """
+    with open(output_file, 'w') as out_file:
+        for result in results:
+            for vdom_name, name, subnets in result.objects:
+                out_file.write(vdom_name + '-' + name + ':' + subnets + '\n')
+
+
+def write_csv(output_file: str, results: list, output_format: str = 'csv') -> int:
+    """ Write the policies of one backup file to a csv file, or to a file of another output format.
+    Returns:
+        hit (int): number of policies written.
+    """
+    columns = merge_columns(results)
+    with open_writer(output_file, columns, output_format=output_format) as writer:
+        writer.write_header()
+        return write_policies(writer, results)
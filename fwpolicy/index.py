@@ -0,0 +1,229 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Byte offset index of a backup config: the vdom sections, the 'config firewall ...' blocks of each vdom and the
+# 'edit' entries of those blocks. The index is built with one quick scan of the raw bytes, without parsing,
+# and can be saved next to the backup file so the next run does not scan at all.
+# The saved index is plain json, read back value by value, so a planted or damaged .idx file cannot run code and is
+# only rebuilt. Its first line holds the vdoms and the tables, each table then has its own line of entry offsets,
+# read only when an entry of that table is looked up, so a lookup does not load the entries of the whole file:
+#   {"version":3,"size":...,"mtime":...,"vdoms":[[vdom,start,end],...],
+#    "tables":[[vdom,table,start,end,line start,line end],...]}
+#   {"entry":[start,end],...}
+# Lookups map the backup with mmap and only parse the slices they need.
+
+import json
+import mmap
+import os.path
+
+from fwpolicy.tree import DEFAULT_VDOM, TreeBuilder, text_lines
+
+INDEX_SUFFIX = '.idx'   # sidecar index file is saved as <backup file>.idx
+INDEX_VERSION = 3
+
+
+class SectionIndex:
+    """ Where things are in one backup file, offsets are (start, end) in bytes.
+        An index read from a sidecar file loads the entries of a table on first use.
+    """
+    __slots__ = ('version', 'size', 'mtime', 'vdoms', 'tables', 'entries', 'infile', 'index_file', 'saved')
+
+    def __init__(self, size: int = 0, mtime: int = 0):
+        self.version = INDEX_VERSION
+        self.size = size    # size and modification time of the backup file the index was built from
+        self.mtime = mtime
+        self.vdoms = []     # (vdom name, start, end) in file order
+        self.tables = dict()    # (vdom, table name) to (start, end) of the 'config firewall ...' block
+        self.entries = dict()   # (vdom, table name) to {entry name: (start, end)}, the loaded tables only
+        self.infile = None      # backup and sidecar file of an index read by read_index
+        self.index_file = None
+        self.saved = dict()     # (vdom, table name) to (start, end) of its entries line in the sidecar file
+
+    def sections(self, vdom: str = None) -> list:
+        """ Vdom sections, all of them or only the ones of one vdom.
+        """
+        return [section for section in self.vdoms if vdom is None or section[0] == vdom]
+
+    def vdom_names(self) -> list:
+        return list(dict.fromkeys(name for name, start, end in self.vdoms))
+
+    def table_entries(self, vdom: str, table_name: str) -> dict:
+        """ Entry name to (start, end) of one table, empty when the vdom has no such table.
+        """
+        key = (vdom, table_name)
+        if key not in self.tables:
+            return {}
+        entries = self.entries.get(key)
+        if entries is None:
+            try:
+                entries = self._read_entries(*self.saved[key])
+            except (OSError, ValueError, KeyError, TypeError, AttributeError):
+                entries = build_index(self.infile).entries.get(key, {})     # damaged sidecar, scan the backup
+            self.entries[key] = entries
+        return entries
+
+    def _read_entries(self, start: int, end: int) -> dict:
+        with open(self.index_file, 'rb') as saved:
+            saved.seek(start)
+            entries = json.loads(saved.read(end - start))
+        return {str(name): (int(entry_start), int(entry_end)) for name, (entry_start, entry_end) in entries.items()}
+
+    def find_entry(self, vdom: str, table_names, name: str):
+        """ First table of table_names having the entry.
+        Returns:
+            table name (str) and (start, end) of the entry, or None when it is not found.
+        """
+        for table_name in table_names:
+            offsets = self.table_entries(vdom, table_name).get(name)
+            if offsets is not None:
+                return table_name, offsets
+        return None
+
+    def matches(self, infile: str) -> bool:
+        """ True when the index was built from the current content of infile.
+        """
+        stat = os.stat(infile)
+        return self.version == INDEX_VERSION and self.size == stat.st_size and self.mtime == stat.st_mtime_ns
+
+    def save(self, index_file: str):
+        """ Write the index to a sidecar file, see the layout above. Every table must be loaded.
+        """
+        lines = []
+        tables = []
+        position = 0
+        for key, (start, end) in self.tables.items():
+            line = json.dumps(self.entries[key], separators=(',', ':')).encode() + b'\n'
+            tables.append([key[0], key[1], start, end, position, position + len(line)])
+            lines.append(line)
+            position += len(line)
+        header = {'version': self.version, 'size': self.size, 'mtime': self.mtime, 'vdoms': self.vdoms,
+                  'tables': tables}
+        with open(index_file, 'wb') as saved:
+            saved.write(json.dumps(header, separators=(',', ':')).encode() + b'\n')
+            saved.writelines(lines)
+
+
+def read_index(infile: str, index_file: str) -> SectionIndex:
+    """ Read the first line of a sidecar file, the entries of each table are read when they are looked up.
+    Raises:
+        OSError, KeyError, TypeError or ValueError when index_file is not a saved index of this version.
+    """
+    with open(index_file, 'rb') as saved:
+        header = json.loads(saved.readline())
+        base = saved.tell()
+    if int(header['version']) != INDEX_VERSION:
+        raise ValueError('index version {}'.format(header['version']))
+    index = SectionIndex(int(header['size']), int(header['mtime']))
+    index.vdoms = [(str(name), int(start), int(end)) for name, start, end in header['vdoms']]
+    for vdom, table_name, start, end, line_start, line_end in header['tables']:
+        key = (str(vdom), str(table_name))
+        index.tables[key] = (int(start), int(end))
+        index.saved[key] = (base + int(line_start), base + int(line_end))
+    index.infile = infile
+    index.index_file = index_file
+    return index
+
+
+def build_index(infile: str) -> SectionIndex:
+    """ Scan the backup file once and record the offsets of the vdoms, firewall tables and their entries.
+        A vdom section starts at a column 0 'edit <vdom>' line, or at 'config global'. The text before the
+        first section belongs to root, it holds the whole config when the backup has no vdom.
+    Parameters:
+        infile (str): backup config file from the FortiGate.
+    Returns:
+        index (SectionIndex): offsets of the sections.
+    """
+    stat = os.stat(infile)
+    index = SectionIndex(stat.st_size, stat.st_mtime_ns)
+    vdom = DEFAULT_VDOM
+    vdom_start = 0
+    table_key = None    # (vdom, table name) of the open firewall table
+    table_start = 0
+    entries = None
+    entry_name = None
+    entry_start = 0
+    offset = 0
+    with open(infile, 'rb') as config_file:
+        for command_line in config_file:
+            if command_line[0:1] == b' ':
+                if entries is not None:
+                    if command_line.startswith(b'    edit '):
+                        entry_name = command_line[9:].strip().strip(b'"').decode()
+                        entry_start = offset
+                    elif command_line.startswith(b'    next') and entry_name is not None:
+                        entries[entry_name] = (entry_start, offset + len(command_line))
+                        entry_name = None
+            elif command_line.startswith(b'edit ') or command_line.startswith(b'config global'):
+                if offset > vdom_start:
+                    index.vdoms.append((vdom, vdom_start, offset))
+                vdom = command_line[5:].strip().decode() if command_line[0:1] == b'e' else 'global'
+                vdom_start = offset
+            elif command_line.startswith(b'config firewall '):
+                table_key = (vdom, command_line[7:].strip().decode())
+                table_start = offset
+                entries = index.entries.setdefault(table_key, dict())
+            elif command_line.startswith(b'end') and table_key is not None:
+                index.tables[table_key] = (table_start, offset + len(command_line))
+                table_key = None
+                entries = None
+            offset += len(command_line)
+    if offset > vdom_start:
+        index.vdoms.append((vdom, vdom_start, offset))
+    if table_key is not None:   # truncated backup, the table runs to the end of the file
+        index.tables[table_key] = (table_start, offset)
+    return index
+
+
+def load_index(infile: str, sidecar: bool = False) -> SectionIndex:
+    """ Get the index of the backup file.
+    Parameters:
+        infile (str): backup config file from the FortiGate.
+        sidecar (bool): reuse <infile>.idx when it matches the backup file, save a new one otherwise.
+    Returns:
+        index (SectionIndex): offsets of the sections.
+    """
+    index_file = infile + INDEX_SUFFIX
+    if sidecar and os.path.isfile(index_file):
+        try:
+            index = read_index(infile, index_file)
+            if index.matches(infile):
+                return index
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass    # unreadable or from an older version, build it again
+    index = build_index(infile)
+    if sidecar:
+        try:
+            index.save(index_file)
+        except OSError as e:
+            print("Warning: cannot save index file {} - {}".format(index_file, e.strerror))
+    return index
+
+
+class BackupMap:
+    """ The backup file mapped in memory, entries are parsed from their slice only.
+        Use with a 'with' statement.
+    """
+
+    def __init__(self, infile: str, index: SectionIndex):
+        self.infile = infile
+        self.index = index
+        self.file = None
+        self.map = None
+
+    def __enter__(self):
+        self.file = open(self.infile, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, *exc):
+        self.map.close()
+        self.file.close()
+
+    def read_entry(self, builder: TreeBuilder, table_name: str, name: str, offsets: tuple):
+        """ Parse one entry into the tree of builder, under table_name of the builder's vdom.
+        Returns:
+            entry (Entry): the parsed entry.
+        """
+        table = builder.open_table(table_name)
+        builder.feed(text_lines(self.map[offsets[0]:offsets[1]]))
+        return table.entry(name)
@@ -0,0 +1,92 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Static interval index over integer (start, end) ranges, each range carries an item (e.g. a policy number).
+#   stab(point)        items whose range contains point, O(log n + k) with a centered interval tree
+#   overlap(lo, hi)    items whose range overlaps [lo, hi], the ranges containing lo plus the ranges starting
+#                      in (lo, hi], found by binary search on the sorted starts, O(log n + k)
+
+from bisect import bisect_right
+
+
+class _Node:
+    """ Node of the centered interval tree: the ranges containing center, sorted by start and by end.
+    """
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, center, by_start, by_end, left, right):
+        self.center = center
+        self.by_start = by_start    # (start, item) ascending
+        self.by_end = by_end    # (end, item) descending
+        self.left = left
+        self.right = right
+
+
+def _build(ranges: list):
+    """ ranges: (start, end, item) sorted by start.
+    """
+    if not ranges:
+        return None
+    center = ranges[len(ranges) // 2][0]
+    left = []
+    right = []
+    middle = []
+    for interval in ranges:
+        if interval[1] < center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            middle.append(interval)
+    return _Node(center,
+                 [(start, item) for start, end, item in middle],
+                 sorted(((end, item) for start, end, item in middle), key=lambda pair: -pair[0]),
+                 _build(left), _build(right))
+
+
+class IntervalIndex:
+    """ Read only index of (start, end, item) ranges, ends are inclusive.
+    """
+    __slots__ = ('root', 'starts', 'items', 'size')
+
+    def __init__(self, ranges):
+        ranges = sorted(ranges, key=lambda interval: interval[0])
+        self.size = len(ranges)
+        self.starts = [start for start, end, item in ranges]
+        self.items = [item for start, end, item in ranges]
+        self.root = _build(ranges)
+
+    def stab(self, point: int) -> list:
+        """ Items of the ranges containing point.
+        """
+        found = []
+        node = self.root
+        while node is not None:
+            if point < node.center:
+                for start, item in node.by_start:
+                    if start > point:
+                        break
+                    found.append(item)
+                node = node.left
+            elif point > node.center:
+                for end, item in node.by_end:
+                    if end < point:
+                        break
+                    found.append(item)
+                node = node.right
+            else:
+                found.extend(item for start, item in node.by_start)
+                break
+        return found
+
+    def overlap(self, low: int, high: int) -> list:
+        """ Items of the ranges overlapping [low, high].
+        """
+        found = self.stab(low)
+        first = bisect_right(self.starts, low)
+        last = bisect_right(self.starts, high)
+        found.extend(self.items[first:last])
+        return found
+
+    def __len__(self):
+        return self.size
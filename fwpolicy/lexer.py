@@ -0,0 +1,29 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Lexer for the FortiGate backup config.
+# Each line is stripped once and split into its keyword (config/edit/set/next/end) and the rest of the line.
+
+
+def tokenize(config_file):
+    """ Split the config lines into tokens, blank and comment lines are dropped.
+    Parameters:
+        config_file: opened backup config, or any iterable of lines.
+    Returns:
+        generator of (line number, top, keyword, rest) where top is True for a line starting at column 0 and
+        rest is the remaining text after the keyword.
+    """
+    line_num = 0
+    for command_line in config_file:
+        line_num += 1
+        cmd_line = command_line.strip()
+        if not cmd_line or cmd_line[0] == '#':
+            continue
+        keyword, _, rest = cmd_line.partition(' ')
+        yield line_num, command_line[0] != ' ', keyword, rest
+
+
+def split_values(value: str) -> list:
+    """ Split a 'set' value such as '"a" "b"' into its names.
+    """
+    return value.strip('"').split('" "')
@@ -0,0 +1,278 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Firewall address objects: the address/vip values and the addrgrp/vipgrp membership of every vdom,
+# and the resolver that expands the (nested) groups down to their subnets.
+# Values are kept as ids of an AddressTable (see addresses.py), the text is only made for the output.
+
+from fwpolicy.addresses import (ALL_ADDRESSES, VIP_EXTERNAL_RANGE, VIP_MAPPED_RANGE, AddressTable, ip_to_int,
+                                mask_bits, merge_ranges, parse_range)
+from fwpolicy.index import BackupMap
+from fwpolicy.lexer import split_values
+from fwpolicy.tree import Config, TreeBuilder
+
+OBJECT_TABLES = ('firewall address', 'firewall addrgrp', 'firewall vip', 'firewall vipgrp')
+ADDRESS_TABLE = 'firewall address'
+DEFAULT_TYPES = (None, 'ipmask')    # address type that is 0.0.0.0/0 when the backup has no 'set subnet'
+
+
+def walk_settings(entry):
+    """ Settings of the entry followed by the settings of its nested tables, e.g. realservers of a vip.
+    """
+    yield from entry.settings.items()
+    if entry.tables:
+        for table in entry.tables.values():
+            yield from walk_settings(table)
+            for nested in table:
+                yield from walk_settings(nested)
+
+
+class ObjectTableBuilder:
+    """ Collects the value of the address/vip objects and the member list of the addrgrp/vipgrp objects.
+        The 'set' attributes are dispatched through a dictionary of handlers.
+    """
+
+    def __init__(self):
+        self.objects = dict()   # (vdom, object) to None, every object in config order
+        self.addresses = AddressTable()
+        self.leaves = dict()    # (vdom, object) to the id of its subnet/range/mapping
+        self.groups = dict()    # (vdom, group) to its member names
+        self.object_key = None
+        self.extip = ''
+        self.start_ip = ''
+        self.setters = {
+            'member': self.set_member,
+            'extip': self.set_extip,
+            'mappedip': self.set_mappedip,
+            'ip': self.set_mappedip,
+            'subnet': self.set_subnet,
+            'start-ip': self.set_start_ip,
+            'end-ip': self.set_end_ip,
+            'wildcard': self.set_wildcard,
+            'country': self.set_name_value,
+            'fqdn': self.set_name_value,
+        }
+
+    def build(self, config: Config):
+        setters = self.setters
+        for vdom in config:
+            for table_name, table in vdom.tables.items():
+                if table_name not in OBJECT_TABLES:
+                    continue
+                for entry in table:
+                    self.object_key = (vdom.name, entry.name)
+                    self.objects[self.object_key] = None
+                    for attribute, value in walk_settings(entry):
+                        setter = setters.get(attribute)
+                        if setter is not None:
+                            setter(value)
+                    if (table_name == ADDRESS_TABLE and self.object_key not in self.leaves and
+                            self.object_key not in self.groups and entry.get('type') in DEFAULT_TYPES):
+                        # e.g. "all", the backup leaves out the default subnet
+                        self.leaves[self.object_key] = self.addresses.add_text(entry.name, (ALL_ADDRESSES,))
+        return ObjectResolver(self.objects, self.addresses, self.leaves, self.groups)
+
+    def set_member(self, value):
+        self.groups[self.object_key] = split_values(value)
+
+    def set_extip(self, value):
+        self.extip = value
+
+    def set_mappedip(self, value):
+        if self.extip == '':
+            self.extip = '0.0.0.0'
+        mapped = value.strip('"')
+        try:
+            form = (VIP_EXTERNAL_RANGE if '-' in self.extip else 0) | (VIP_MAPPED_RANGE if '-' in mapped else 0)
+            self.leaves[self.object_key] = self.addresses.add_vip(parse_range(self.extip), parse_range(mapped), form)
+        except ValueError:  # several mapped ranges, kept as text
+            self.leaves[self.object_key] = self.addresses.add_text(self.extip + '->' + mapped)
+
+    def set_subnet(self, value):    # address object, extract the ipmask
+        ip_mask = value.split(' ')
+        try:
+            if len(ip_mask) == 1 and '/' in value:
+                ip, prefix = ip_to_int(value.split('/')[0]), int(value.split('/')[1])
+            else:
+                ip, prefix = ip_to_int(ip_mask[0]), mask_bits(ip_mask[1])
+            self.leaves[self.object_key] = self.addresses.add_subnet(ip, prefix)
+        except (ValueError, IndexError):
+            self.leaves[self.object_key] = self.addresses.add_text(value)
+
+    def set_start_ip(self, value):  # IP range start IP
+        self.start_ip = value
+
+    def set_end_ip(self, value):    # IP range end IP, combine the range
+        try:
+            self.leaves[self.object_key] = self.addresses.add_range(ip_to_int(self.start_ip), ip_to_int(value))
+        except ValueError:
+            self.leaves[self.object_key] = self.addresses.add_text(self.start_ip + '-' + value)
+
+    def set_wildcard(self, value):  # wildcard mask object
+        self.leaves[self.object_key] = self.addresses.add_text(value)
+
+    def set_name_value(self, value):    # geography and FQDN object
+        self.leaves[self.object_key] = self.addresses.add_text(value.strip('"'))
+
+
+class ObjectResolver:
+    """ Expands address names to subnets.
+        Groups are expanded recursively whatever order they are defined in, each group is expanded once and
+        the result is kept per (vdom, group). A group reaching itself again is recorded once in 'cycles' and the
+        loop is not followed.
+    """
+
+    def __init__(self, objects: dict, addresses: AddressTable, leaves: dict, groups: dict):
+        self.objects = objects
+        self.addresses = addresses
+        self.leaves = leaves
+        self.groups = groups
+        self.expanded = dict()  # (vdom, group) to tuple of value ids
+        self.texts = dict()     # (vdom, object) to '|' separated subnets
+        self.cycles = dict()    # (vdom, group) found inside its own members, in the order found
+
+    def expand(self, vdom: str, name: str) -> tuple:
+        """ Value ids of the subnets of an object, without duplicates and in member order.
+            An object without value, or a name that is not an object, stands for itself.
+        """
+        key = (vdom, name)
+        if key in self.expanded:
+            return self.expanded[key]
+        if key not in self.groups:
+            return (self._leaf(key),)
+        subnets = self._expand_group(key, [key])[0]
+        self.expanded[key] = subnets    # complete even when a loop was cut, every member was visited from here
+        return subnets
+
+    def _expand_group(self, key: tuple, path: list) -> tuple:
+        """
+        Returns:
+            subnets (tuple): value ids of the subnets reached from the group.
+            complete (bool): False when a loop back to 'path' was cut below the group, the result then
+                depends on where the expansion started and is not cached.
+        """
+        subnets = dict()
+        complete = True
+        vdom = key[0]
+        for member in self.groups[key]:
+            member_key = (vdom, member)
+            if member_key in self.expanded:
+                subnets.update(dict.fromkeys(self.expanded[member_key]))
+            elif member_key not in self.groups:
+                subnets[self._leaf(member_key)] = None
+            elif member_key in path:
+                self.cycles[member_key] = None  # a loop is walked again from each group outside it
+                complete = False
+            else:
+                path.append(member_key)
+                member_subnets, member_complete = self._expand_group(member_key, path)
+                path.pop()
+                subnets.update(dict.fromkeys(member_subnets))
+                complete = complete and member_complete
+        result = tuple(subnets)
+        if complete:
+            self.expanded[key] = result
+        return result, complete
+
+    def _leaf(self, key: tuple) -> int:
+        value_id = self.leaves.get(key)
+        if value_id is None:
+            value_id = self.addresses.add_text(key[1])
+        return value_id
+
+    def text(self, vdom: str, name: str) -> str:
+        """ '|' separated subnets of an object.
+        """
+        key = (vdom, name)
+        text = self.texts.get(key)
+        if text is None:
+            text = self.texts[key] = '|'.join(map(self.addresses.text, self.expand(vdom, name)))
+        return text
+
+    def value_ids(self, members: list, vdom: str) -> tuple:
+        """ Value ids of the subnets of all members, without duplicates.
+        """
+        if len(members) == 1:
+            return self.expand(vdom, members[0])
+        value_ids = dict()
+        for member in members:
+            value_ids.update(dict.fromkeys(self.expand(vdom, member)))
+        return tuple(value_ids)
+
+    def ranges(self, members: list, vdom: str) -> tuple:
+        """ Numeric form of the members.
+        Returns:
+            ranges (list): merged (start, end) ranges of all members.
+            texts (list): values without range, e.g. fqdn or country.
+        """
+        ranges = []
+        texts = []
+        addresses = self.addresses
+        for value_id in self.value_ids(members, vdom):
+            value_ranges = addresses.ranges(value_id)
+            if value_ranges:
+                ranges.extend(value_ranges)
+            else:
+                texts.append(addresses.text(value_id))
+        return merge_ranges(ranges), texts
+
+    def resolve(self, members: list, vdom: str) -> str:
+        """ Replace each member name by its subnets, unknown members are kept as they are.
+        Parameters:
+            members (list): address names from 'set srcaddr' or 'set dstaddr'.
+            vdom (str): vdom of the policy.
+        Returns:
+            subnets (str): '|' separated list of subnets.
+        """
+        if len(members) == 1:
+            return self.text(vdom, members[0])
+        return '|'.join(map(self.addresses.text, self.value_ids(members, vdom)))
+
+    def items(self):
+        """ Iterate over (vdom, object, subnets) of every object in config order.
+        """
+        for vdom, name in self.objects:
+            yield vdom, name, self.text(vdom, name)
+
+
+def get_object_table(config: Config) -> ObjectResolver:
+    """ Get IP subnet of every address/addrgrp/vip/vipgrp object.
+    Parameters:
+        config (Config): parsed backup config.
+    Returns:
+        objects (ObjectResolver): resolver of the object names.
+    """
+    return ObjectTableBuilder().build(config)
+
+
+def resolve_object(infile: str, index, vdom: str, name: str) -> tuple:
+    """ Resolve one object without parsing the whole backup, only the object and its members are read.
+    Parameters:
+        infile (str): backup config file from the FortiGate.
+        index (SectionIndex): index of the backup file, see index.py.
+        vdom (str): vdom of the object.
+        name (str): object name.
+    Returns:
+        subnets (str): '|' separated subnets, None when the vdom has no such object.
+        cycles (list): address groups found in a loop.
+    """
+    if index.find_entry(vdom, OBJECT_TABLES, name) is None:
+        return None, []
+    builder = TreeBuilder(vdom)
+    pending = [name]
+    seen = {name}
+    with BackupMap(infile, index) as backup:
+        while pending:
+            object_name = pending.pop()
+            found = index.find_entry(vdom, OBJECT_TABLES, object_name)
+            if found is None:
+                continue    # not an object, the name stands for itself
+            table_name, offsets = found
+            members = backup.read_entry(builder, table_name, object_name, offsets).get('member')
+            if members:
+                for member in split_values(members):
+                    if member not in seen:
+                        seen.add(member)
+                        pending.append(member)
+    objects = ObjectTableBuilder().build(builder.config)
+    return objects.text(vdom, name), list(objects.cycles)
@@ -0,0 +1,129 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Builds what the exporter needs from the parsed config tree (see tree.py):
+# the policy column list, the policy records, the address object resolver (see objects.py) and the service
+# resolver (see services.py).
+# The backup file is read once into the tree, every table below is taken from it instead of re-reading the file.
+
+import time
+from collections import namedtuple
+
+from fwpolicy.buffer import PolicyBuffer
+from fwpolicy.lexer import split_values
+from fwpolicy.objects import get_object_table
+from fwpolicy.services import get_service_table
+from fwpolicy.tree import DEFAULT_VDOM, Config, parse_config
+from fwpolicy.writer import ColumnRegistry
+
+# columns that always come first in the output, the rest are added in the order they appear in the config
+FIXED_COLUMNS = ['vdom', 'id', 'srcaddr', 'srcsubnet', 'dstaddr', 'dstsubnet']
+
+POLICY_TABLE = 'firewall policy'
+
+SKIP_ATTRIBUTES = ('uuid', 'name')  # policy attributes kept in the records but not exported as columns
+
+SectionExport = namedtuple('SectionExport', ['columns', 'policies', 'objects', 'cycles', 'service_cycles',
+                                             'lines', 'timings'])
+
+
+def get_policies(config: Config, table_names: tuple = None) -> tuple:
+    """ Get the policy records and the column list.
+    Parameters:
+        config (Config): parsed backup config.
+        table_names (tuple): policy tables to read, e.g. (POLICY_TABLE,) for the IPv4 policies only, None for every
+            'firewall policy...' table (policy6, policy46, ...).
+    Returns:
+        columns (ColumnRegistry): policy column names, in the order they first appear.
+        policies (list): one dict per policy, column name to raw value, plus the uuid and name of the policy.
+            'srcsubnet' and 'dstsubnet' hold the member list of the policy, to be resolved with the object resolver,
+            'service_ports' the service names, to be resolved with the service resolver.
+    """
+    columns = ColumnRegistry(FIXED_COLUMNS)
+    return columns, list(iter_policies(config, columns, table_names))
+
+
+def iter_policies(config: Config, columns: ColumnRegistry, table_names: tuple = None):
+    """ Same records as get_policies, one at a time, the columns are added to columns as they are found.
+    """
+    for vdom in config:
+        for table_name, table in vdom.tables.items():
+            if not table_name.startswith(POLICY_TABLE) or (table_names is not None and table_name not in table_names):
+                continue
+            for entry in table:
+                record = dict()     # policy place holder
+                if entry.name[:1].isdigit():
+                    record['vdom'] = vdom.name
+                    record['id'] = entry.name
+                for attribute, value in entry.settings.items():
+                    if attribute == 'srcaddr' or attribute == 'dstaddr':
+                        record[attribute] = value
+                        record[attribute[:3] + 'subnet'] = split_values(value)
+                    elif attribute == 'service':
+                        columns.add(attribute)
+                        columns.add('service_ports')    # next to the services, the other columns keep their place
+                        record[attribute] = value + ' '
+                        record['service_ports'] = split_values(value)
+                    elif attribute == 'uuid':
+                        record[attribute] = value
+                    else:
+                        if attribute not in SKIP_ATTRIBUTES:
+                            columns.add(attribute)
+                        record[attribute] = value + ' ' if value else ''
+                yield record
+
+
+def export_config(config: Config) -> SectionExport:
+    """ Resolve the policies of a parsed config.
+    Parameters:
+        config (Config): parsed backup config, or one section of it.
+    Returns:
+        export (SectionExport): columns in the order they first appear, PolicyBuffer of the policy records with
+            'srcsubnet', 'dstsubnet' and 'service_ports' resolved, (vdom, object, subnets) of every object,
+            address groups and service groups found in a loop, number of lines read and the seconds taken by
+            each stage (see stats.py).
+    """
+    started = time.perf_counter()
+    columns = ColumnRegistry(FIXED_COLUMNS)
+    objects = get_object_table(config)
+    services = get_service_table(config)
+    built = time.perf_counter()
+    resolving = 0.0     # groups are expanded the first time a policy uses them
+    policies = PolicyBuffer()
+    for policy in iter_policies(config, columns):
+        resolve_started = time.perf_counter()
+        vdom_name = policy.get('vdom', DEFAULT_VDOM)
+        for field in ('srcsubnet', 'dstsubnet'):
+            if field in policy:
+                policy[field] = objects.resolve(policy[field], vdom_name)
+        if 'service_ports' in policy:
+            policy['service_ports'] = services.resolve(policy['service_ports'], vdom_name)
+        resolving += time.perf_counter() - resolve_started
+        policies.append(policy)
+    exported = time.perf_counter()
+    object_subnets = list(objects.items())
+    finished = time.perf_counter()
+    timings = {'object table': built - started, 'group resolution': resolving + finished - exported,
+               'policy export': exported - built - resolving}
+    return SectionExport(columns.names, policies, object_subnets, list(objects.cycles), list(services.cycles),
+                         config.lines, timings)
+
+
+def export_section(infile: str, start: int = 0, end: int = None, progress=None) -> SectionExport:
+    """ Parse the backup config, or one section of it, and resolve the subnets of its policies.
+        The vdoms of a section do not depend on the other sections, so sections can be exported in parallel
+        and merged in file order.
+    Parameters:
+        infile (str): backup config file from the FortiGate.
+        start (int): byte offset of the section, see index.py.
+        end (int): end of the section, None for the end of the file.
+        progress: called with (vdom, line number) while the file is read, None for no progress.
+    Returns:
+        export (SectionExport): see export_config, with the time taken to parse the file.
+    """
+    started = time.perf_counter()
+    config = parse_config(infile, start, end, progress)
+    parsed = time.perf_counter()
+    export = export_config(config)
+    export.timings['parse'] = parsed - started
+    return export
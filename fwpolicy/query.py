@@ -0,0 +1,126 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# "Which policies allow traffic to or from this IP": the resolved source and destination ranges of every policy
+# are put in an interval index per vdom, so each query is a tree lookup instead of a scan of all policies.
+# A negated source or destination (srcaddr-negate/dstaddr-negate) is indexed by the addresses outside its ranges.
+# Only the IPv4 policies of 'firewall policy' are indexed, the policy6/policy46/policy64 addresses are not IPv4 objects.
+
+from fwpolicy.addresses import complement_ranges, parse_range, prefix_range, ip_to_int
+from fwpolicy.index import load_index
+from fwpolicy.intervals import IntervalIndex
+from fwpolicy.objects import get_object_table
+from fwpolicy.parser import POLICY_TABLE, get_policies
+from fwpolicy.tree import DEFAULT_VDOM, parse_config
+from fwpolicy.writer import ColumnRegistry, open_writer
+
+QUERY_COLUMNS = ['query', 'vdom', 'id', 'match', 'srcaddr', 'dstaddr', 'action', 'service']
+
+
+def parse_query(text: str) -> tuple:
+    """ '10.0.0.1', '10.0.0.0/24' or '10.0.0.1-10.0.0.9' to (start, end), raises ValueError otherwise.
+    """
+    text = text.strip()
+    if '/' in text:
+        ip, _, prefix = text.partition('/')
+        if not prefix.isdigit() or int(prefix) > 32:
+            raise ValueError('invalid prefix length in {!r}'.format(text))
+        return prefix_range(ip_to_int(ip), int(prefix))
+    return parse_range(text)
+
+
+def read_queries(query_file: str) -> list:
+    """ One IP, subnet or range per line, blank lines and lines starting with '#' are skipped.
+    """
+    with open(query_file, 'r') as source_file:
+        return [line.strip() for line in source_file if line.strip() and not line.strip().startswith('#')]
+
+
+class PolicyRangeIndex:
+    """ Source and destination interval index of the policies of each vdom.
+    """
+
+    def __init__(self):
+        self.policies = []  # policy records, the items of the indexes are positions in this list
+        self.indexes = dict()   # vdom to (source IntervalIndex, destination IntervalIndex)
+
+    def add_config(self, config):
+        """ Add the IPv4 policies of a parsed config, the indexes are built again by build().
+        """
+        columns, policies = get_policies(config, (POLICY_TABLE,))
+        objects = get_object_table(config)
+        for record in policies:
+            vdom_name = record.get('vdom', DEFAULT_VDOM)
+            number = len(self.policies)
+            self.policies.append(record)
+            source, destination = self.indexes.setdefault(vdom_name, ([], []))
+            for field, negate, ranges in (('srcsubnet', 'srcaddr-negate', source),
+                                          ('dstsubnet', 'dstaddr-negate', destination)):
+                if field in record:
+                    field_ranges = objects.ranges(record[field], vdom_name)[0]
+                    if record.get(negate, '').strip() == 'enable':
+                        field_ranges = complement_ranges(field_ranges)
+                    for start, end in field_ranges:
+                        ranges.append((start, end, number))
+
+    def build(self):
+        for vdom_name, (source, destination) in self.indexes.items():
+            if isinstance(source, list):
+                self.indexes[vdom_name] = (IntervalIndex(source), IntervalIndex(destination))
+
+    def query(self, start: int, end: int, vdom: str = None) -> list:
+        """ Policies with a source or destination overlapping [start, end].
+        Returns:
+            matches (list): (policy record, 'src', 'dst' or 'src+dst') in config order.
+        """
+        matches = dict()
+        for vdom_name, (source, destination) in self.indexes.items():
+            if vdom is not None and vdom_name != vdom:
+                continue
+            for side, index in (('src', source), ('dst', destination)):
+                found = index.stab(start) if start == end else index.overlap(start, end)
+                for number in found:
+                    if number not in matches:
+                        matches[number] = side
+                    elif side not in matches[number]:
+                        matches[number] += '+' + side
+        return [(self.policies[number], matches[number]) for number in sorted(matches)]
+
+
+def build_range_index(backup_file: str, vdom_filter: str = None, use_index: bool = False) -> PolicyRangeIndex:
+    """ Parse the backup file, or only the sections of one vdom, and index the ranges of its policies.
+    """
+    ranges = PolicyRangeIndex()
+    if vdom_filter is None and not use_index:
+        ranges.add_config(parse_config(backup_file))
+    else:
+        for name, start, end in load_index(backup_file, use_index).sections(vdom_filter):
+            ranges.add_config(parse_config(backup_file, start, end))
+    ranges.build()
+    return ranges
+
+
+def write_matches(output_file: str, ranges: PolicyRangeIndex, queries: list, vdom: str = None,
+                  output_format: str = 'csv') -> tuple:
+    """ Write the policies matching each query to a csv file, or to a file of another output format.
+    Returns:
+        matches (int): number of rows written.
+        errors (list): queries that are not an IP, subnet or range.
+    """
+    count = 0
+    errors = []
+    with open_writer(output_file, ColumnRegistry(QUERY_COLUMNS), '', output_format) as writer:
+        writer.write_header()
+        for text in queries:
+            try:
+                start, end = parse_query(text)
+            except ValueError:
+                errors.append(text)
+                continue
+            for record, side in ranges.query(start, end, vdom):
+                writer.write({'query': text, 'vdom': record.get('vdom', ''), 'id': record.get('id', ''),
+                              'match': side, 'srcaddr': record.get('srcaddr', ''),
+                              'dstaddr': record.get('dstaddr', ''), 'action': record.get('action', ''),
+                              'service': record.get('service', '')})
+                count += 1
+    return count, errors
@@ -0,0 +1,155 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Firewall service objects: the protocol/port ranges of the 'service custom' objects and the member list of the
+# 'service group' objects of every vdom, expanded with the same resolver as the address groups (see objects.py).
+# A protocol and port is one integer, protocol number << 16 | port, so the ports of all protocols are (start, end)
+# ranges that merge and compare like the address ranges. ICMP types take the place of the port,
+# source ports are not kept.
+
+from fwpolicy.addresses import AddressTable, merge_ranges
+from fwpolicy.lexer import split_values
+from fwpolicy.objects import ObjectResolver
+from fwpolicy.tree import Config
+
+SERVICE_TABLE = 'firewall service custom'
+SERVICE_GROUP_TABLE = 'firewall service group'
+
+ICMP = 1
+TCP = 6
+UDP = 17
+ICMP6 = 58
+SCTP = 132
+PROTOCOL_NAMES = {ICMP: 'icmp', TCP: 'tcp', UDP: 'udp', ICMP6: 'icmp6', SCTP: 'sctp'}
+PORT_RANGES = (('tcp-portrange', TCP), ('udp-portrange', UDP), ('sctp-portrange', SCTP))
+DEFAULT_PROTOCOL = 'TCP/UDP/SCTP'
+
+ALL_PORTS = 0xFFFF
+ALL_SERVICES = (0, 0xFFFFFF)    # 'set protocol IP' with protocol-number 0, every protocol and port
+
+
+def port_range(protocol: int, first: int, last: int = None) -> tuple:
+    """ (start, end) of ports first to last of the protocol, last defaults to first.
+    """
+    if last is None:
+        last = first
+    if not 0 <= first <= last <= ALL_PORTS:
+        raise ValueError('invalid port range {}-{}'.format(first, last))
+    return protocol << 16 | first, protocol << 16 | last
+
+
+def parse_ports(protocol: int, value: str) -> list:
+    """ 'set tcp-portrange 80 443:1024-65535 8000-8100' to the (start, end) ranges of the destination ports,
+        raises ValueError for anything else.
+    """
+    ranges = []
+    for ports in value.split():
+        first, _, last = ports.partition(':')[0].partition('-')
+        ranges.append(port_range(protocol, int(first), int(last) if last else None))
+    return ranges
+
+
+def service_ranges(entry) -> list:
+    """ Ranges of a 'service custom' entry, empty for a protocol without ports such as the explicit proxy ones.
+        Raises ValueError when a port or protocol number is not a number.
+    """
+    protocol = (entry.get('protocol') or DEFAULT_PROTOCOL).upper()
+    if protocol == DEFAULT_PROTOCOL:
+        ranges = []
+        for attribute, number in PORT_RANGES:
+            value = entry.get(attribute)
+            if value:
+                ranges.extend(parse_ports(number, value))
+        return ranges
+    if protocol == 'ICMP' or protocol == 'ICMP6':
+        number = ICMP if protocol == 'ICMP' else ICMP6
+        icmp_type = entry.get('icmptype')
+        if icmp_type:
+            return [port_range(number, int(icmp_type))]
+        return [port_range(number, 0, ALL_PORTS)]
+    if protocol == 'IP':
+        number = int(entry.get('protocol-number') or 0)
+        if number == 0:
+            return [ALL_SERVICES]
+        return [port_range(number, 0, ALL_PORTS)]
+    return []
+
+
+def format_ports(start: int, end: int) -> list:
+    """ Display form of a merged range, one item per protocol: 'tcp/80', 'udp/5000-5100', 'tcp' for every port,
+        'ip/47' for every port of a protocol without name and 'ALL' for every protocol.
+    """
+    if (start, end) == ALL_SERVICES:
+        return ['ALL']
+    items = []
+    for protocol in range(start >> 16, (end >> 16) + 1):
+        first = start & ALL_PORTS if protocol == start >> 16 else 0
+        last = end & ALL_PORTS if protocol == end >> 16 else ALL_PORTS
+        name = PROTOCOL_NAMES.get(protocol)
+        if first == 0 and last == ALL_PORTS:
+            items.append(name or 'ip/' + str(protocol))
+        elif first == last:
+            items.append('{}/{}'.format(name or protocol, first))
+        else:
+            items.append('{}/{}-{}'.format(name or protocol, first, last))
+    return items
+
+
+class ServiceResolver(ObjectResolver):
+    """ Expands service names to their merged protocol/port ranges.
+        The groups are expanded once by the ObjectResolver, the text of each member list is kept too, so a
+        large group used by many policies is only merged and formatted once.
+    """
+
+    def __init__(self, objects: dict, values: AddressTable, leaves: dict, groups: dict):
+        super().__init__(objects, values, leaves, groups)
+        self.ports = dict()     # (vdom, member names) to text
+
+    def resolve(self, members: list, vdom: str) -> str:
+        """ Replace the service names by their ports, unknown services are kept as they are.
+        Parameters:
+            members (list): service names from 'set service'.
+            vdom (str): vdom of the policy.
+        Returns:
+            ports (str): '|' separated list of protocol/port ranges.
+        """
+        key = (vdom, tuple(members))
+        text = self.ports.get(key)
+        if text is None:
+            ranges, texts = self.ranges(members, vdom)
+            items = []
+            for start, end in ranges:
+                items.extend(format_ports(start, end))
+            text = self.ports[key] = '|'.join(items + texts)
+        return text
+
+
+def get_service_table(config: Config) -> ServiceResolver:
+    """ Get the ports of every service custom/group object.
+    Parameters:
+        config (Config): parsed backup config.
+    Returns:
+        services (ServiceResolver): resolver of the service names.
+    """
+    objects = dict()
+    values = AddressTable()     # a service is a named value with its ranges, shown by its name
+    leaves = dict()
+    groups = dict()
+    for vdom, table in config.tables(SERVICE_TABLE):
+        for entry in table:
+            key = (vdom.name, entry.name)
+            objects[key] = None
+            try:
+                ranges = service_ranges(entry)
+            except ValueError:
+                continue    # kept as its name
+            if ranges:
+                leaves[key] = values.add_text(entry.name, tuple(merge_ranges(ranges)))
+    for vdom, table in config.tables(SERVICE_GROUP_TABLE):
+        for entry in table:
+            key = (vdom.name, entry.name)
+            objects[key] = None
+            members = entry.get('member')
+            if members:
+                groups[key] = split_values(members)
+    return ServiceResolver(objects, values, leaves, groups)
@@ -0,0 +1,121 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Run statistics of an export: wall time and lines per second of each stage, peak memory, per vdom counts,
+# an optional cProfile dump, and the progress reporter used while the backup is read.
+#   parse             backup file read into the config tree (see tree.py)
+#   object table      address/vip/service objects and groups collected (see objects.py, services.py)
+#   group resolution  groups expanded and the policy members resolved
+#   policy export     policy records built and buffered (see buffer.py)
+#   write             rows written to the output (see writer.py)
+
+import atexit
+import sys
+import time
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+STAGES = ('parse', 'object table', 'group resolution', 'policy export')
+PROGRESS_INTERVAL = 2.0     # seconds between two progress lines
+
+
+class ProgressReporter:
+    """ Prints the vdom and line the parser is at, at most once every interval seconds.
+    """
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL):
+        self.interval = interval
+        self.last = time.monotonic()
+
+    def __call__(self, vdom: str, line_num: int):
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            print('working on vdom {} line {}'.format(vdom, line_num))
+
+
+def peak_rss() -> tuple:
+    """ Peak resident memory in bytes of this process and of its largest child process, None on Windows.
+    """
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == 'darwin' else 1024     # ru_maxrss is in bytes on macOS, in KB elsewhere
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+def stage_timings(results: list) -> dict:
+    """ Seconds of each stage, added up over the sections.
+    """
+    timings = dict.fromkeys(STAGES, 0.0)
+    for result in results:
+        for stage, seconds in result.timings.items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+    return timings
+
+
+def vdom_counts(results: list) -> dict:
+    """ vdom to (number of policies, number of objects), in file order.
+    """
+    counts = dict()
+    for result in results:
+        for vdom_name, name, subnets in result.objects:
+            policies, objects = counts.get(vdom_name, (0, 0))
+            counts[vdom_name] = (policies, objects + 1)
+        for policy in result.policies:
+            vdom_name = policy.get('vdom', '')
+            policies, objects = counts.get(vdom_name, (0, 0))
+            counts[vdom_name] = (policies + 1, objects)
+    return counts
+
+
+def print_stats(results: list, write_seconds: float, elapsed: float, cached: bool = False):
+    """ Print the time of each stage, the peak memory and the counts of each vdom.
+    Parameters:
+        results (list): SectionExport of each section.
+        write_seconds (float): time taken to write the output.
+        elapsed (float): wall time of the whole export.
+        cached (bool): the results come from the cache, the parse stages are the ones of the cached run.
+    """
+    lines = sum(result.lines for result in results)
+    timings = stage_timings(results)
+    timings['write'] = write_seconds
+    print('*' * 60)
+    print('{:<18}  {:>8}  {:>12}'.format('stage', 'seconds', 'lines/s'))
+    for stage, seconds in timings.items():
+        rate = '{:,.0f}'.format(lines / seconds) if seconds > 0 else '-'
+        print('{:<18}  {:>8.2f}  {:>12}'.format(stage, seconds, rate))
+    rate = '{:,.0f}'.format(lines / elapsed) if elapsed > 0 else '-'
+    print('{:<18}  {:>8.2f}  {:>12}'.format('total', elapsed, rate))
+    if cached:
+        print('Stages before write are from the cached run')
+    if len(results) > 1:
+        print('Stage times are added up over {} sections'.format(len(results)))
+    rss = peak_rss()
+    if rss is not None:
+        print('Peak RSS: {:.1f} MB, largest worker: {:.1f} MB'.format(rss[0] / 1e6, rss[1] / 1e6))
+    print('{} lines, {} sections'.format(lines, len(results)))
+    counts = vdom_counts(results)
+    width = max([len(vdom_name) for vdom_name in counts] + [4])
+    print('{:<{}}  {:>8}  {:>8}'.format('vdom', width, 'policies', 'objects'))
+    for vdom_name, (policies, objects) in counts.items():
+        print('{:<{}}  {:>8}  {:>8}'.format(vdom_name, width, policies, objects))
+
+
+def start_profile(profile_file: str):
+    """ Run the rest of the program under cProfile, the stats are dumped to profile_file when it exits.
+        Read them with: python -m pstats <profile_file>
+    """
+    import cProfile
+    profiler = cProfile.Profile()
+    atexit.register(_dump_profile, profiler, profile_file)
+    profiler.enable()
+
+
+def _dump_profile(profiler, profile_file: str):
+    profiler.disable()
+    profiler.dump_stats(profile_file)
+    print('Profile written to {}'.format(profile_file))
@@ -0,0 +1,249 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Parsed representation of the FortiGate backup config.
+# The config/edit/set/next/end structure is kept as a tree:
+#   Config -> Vdom -> Table ('config firewall policy') -> Entry ('edit 12') -> settings ('set srcaddr ...')
+# Nodes use __slots__ and the attribute/table names are interned, so the tree of a large backup stays small.
+#
+# Example:
+#   tree = parse_config('backup.conf')
+#   for policy in tree.vdom('root').table('firewall policy'):
+#       print(policy.name, policy.get('srcaddr'))
+
+import io
+import sys
+
+from fwpolicy.lexer import tokenize
+
+GLOBAL_VDOM = 'global'  # name given to the 'config global' section
+DEFAULT_VDOM = 'root'   # name used when the backup has no vdom
+PROGRESS_LINES = 0xFFFF     # progress is also reported every 65536 lines, for a large vdom
+
+
+class Entry:
+    """ One 'edit <name>' ... 'next' item of a table.
+    """
+    __slots__ = ('name', 'settings', 'tables')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.settings = dict()  # attribute name to raw value, in config order
+        self.tables = None      # nested 'config' blocks, created on first use
+
+    def get(self, attribute: str, default=None):
+        return self.settings.get(attribute, default)
+
+    def table(self, name: str):
+        """ Nested table of the entry, e.g. 'realservers' of a vip.
+        """
+        if self.tables is None or name not in self.tables:
+            raise KeyError(name)
+        return self.tables[name]
+
+    def add_table(self, name: str):
+        if self.tables is None:
+            self.tables = dict()
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = Table(name)
+        return table
+
+    def __repr__(self):
+        return 'Entry({!r})'.format(self.name)
+
+
+class Table(Entry):
+    """ One 'config <name>' ... 'end' block. It holds entries when the block uses 'edit', settings otherwise.
+    """
+    __slots__ = ('entries',)
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.entries = dict()   # entry name to Entry, in config order
+
+    def entry(self, name: str) -> Entry:
+        return self.entries[name]
+
+    def add_entry(self, name: str) -> Entry:
+        entry = self.entries.get(name)
+        if entry is None:
+            entry = self.entries[name] = Entry(name)
+        return entry
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return 'Table({!r}, {} entries)'.format(self.name, len(self.entries))
+
+
+class Vdom:
+    """ Top level tables of one vdom.
+    """
+    __slots__ = ('name', 'tables')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.tables = dict()    # table name to Table, in config order
+
+    def table(self, name: str) -> Table:
+        return self.tables[name]
+
+    def add_table(self, name: str) -> Table:
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = Table(name)
+        return table
+
+    def __repr__(self):
+        return 'Vdom({!r})'.format(self.name)
+
+
+class Config:
+    """ Whole backup config, vdoms are kept in the order their tables appear in the file.
+    """
+    __slots__ = ('vdoms', 'lines')
+
+    def __init__(self):
+        self.vdoms = dict()
+        self.lines = 0  # number of lines read
+
+    def vdom(self, name: str) -> Vdom:
+        return self.vdoms[name]
+
+    def add_vdom(self, name: str) -> Vdom:
+        vdom = self.vdoms.get(name)
+        if vdom is None:
+            vdom = self.vdoms[name] = Vdom(name)
+        return vdom
+
+    def tables(self, name: str):
+        """ Iterate over (vdom, table) of every vdom having the table.
+        """
+        for vdom in self.vdoms.values():
+            if name in vdom.tables:
+                yield vdom, vdom.tables[name]
+
+    def __iter__(self):
+        return iter(self.vdoms.values())
+
+    def __repr__(self):
+        return 'Config({})'.format(list(self.vdoms))
+
+
+class TreeBuilder:
+    """ Builds the Config tree from the tokens of a backup config.
+        'config vdom' and 'config global' are not tables, they only select the vdom the next tables belong to.
+    """
+
+    def __init__(self, vdom_name: str = DEFAULT_VDOM, progress=None):
+        """
+        Parameters:
+            vdom_name (str): vdom of the tables found outside of a vdom section.
+            progress: called with (vdom, line number) at each vdom and every 65536 lines, e.g. a
+                ProgressReporter (see stats.py), None for no progress.
+        """
+        self.config = Config()
+        self.vdom_name = vdom_name
+        self.progress = progress
+        self.stack = []     # open Table/Entry nodes, or a vdom/global marker string
+        self.keywords = {
+            'config': self.on_config,
+            'edit': self.on_edit,
+            'set': self.on_set,
+            'next': self.on_next,
+            'end': self.on_end,
+        }
+
+    def feed(self, config_file):
+        """ Parse all lines of the config file.
+        """
+        keywords = self.keywords
+        progress = self.progress
+        line_num = 0
+        for line_num, top, keyword, rest in tokenize(config_file):
+            handler = keywords.get(keyword)
+            if handler is not None:
+                handler(line_num, rest)
+            if progress is not None and not line_num & PROGRESS_LINES:
+                progress(self.vdom_name, line_num)
+        self.config.lines += line_num
+        return self.config
+
+    def open_table(self, name: str) -> Table:
+        """ Continue parsing inside the top level table of the current vdom, used to parse single entries.
+        """
+        table = self.config.add_vdom(self.vdom_name).add_table(sys.intern(name))
+        self.stack[:] = [table]
+        return table
+
+    def on_config(self, line_num, rest):
+        stack = self.stack
+        parent = stack[-1] if stack else None
+        if parent is None or parent.__class__ is str:
+            if rest == 'vdom':
+                stack.append(rest)
+            elif rest == 'global':
+                self.vdom_name = GLOBAL_VDOM
+                stack.append(rest)
+            else:
+                stack.append(self.config.add_vdom(self.vdom_name).add_table(sys.intern(rest)))
+        else:
+            stack.append(parent.add_table(sys.intern(rest)))
+
+    def on_edit(self, line_num, rest):
+        stack = self.stack
+        parent = stack[-1] if stack else None
+        if parent is None or parent.__class__ is str:  # extract vdom name
+            self.vdom_name = rest
+            if self.progress is not None:
+                self.progress(rest, line_num)
+        elif parent.__class__ is Table:
+            stack.append(parent.add_entry(rest.strip('"')))
+
+    def on_set(self, line_num, rest):
+        stack = self.stack
+        if stack and stack[-1].__class__ is not str:
+            attribute, _, value = rest.partition(' ')
+            stack[-1].settings[sys.intern(attribute)] = value
+
+    def on_next(self, line_num, rest):
+        stack = self.stack
+        if stack and stack[-1].__class__ is Entry:
+            stack.pop()
+
+    def on_end(self, line_num, rest):
+        stack = self.stack
+        while stack and stack[-1].__class__ is Entry:     # entry without 'next'
+            stack.pop()
+        if stack:
+            stack.pop()
+
+
+def parse_config(infile: str, start: int = 0, end: int = None, progress=None) -> Config:
+    """ Read the backup config file into a Config tree.
+    Parameters:
+        infile (str): backup config file from the FortiGate.
+        start (int): byte offset to start reading from, see index.py.
+        end (int): byte offset to stop reading at, None for the end of the file.
+        progress: called with (vdom, line number) while the file is read, None for no progress.
+    Returns:
+        config (Config): parsed config.
+    """
+    if start == 0 and end is None:
+        with open(infile, 'r') as config_file:
+            return TreeBuilder(progress=progress).feed(config_file)
+    with open(infile, 'rb') as config_file:
+        config_file.seek(start)
+        section = config_file.read(-1 if end is None else end - start)
+    return TreeBuilder(progress=progress).feed(text_lines(section))
+
+
+def text_lines(data: bytes):
+    """ Lines of a slice of the backup file, decoded the same way as the file opened in text mode.
+    """
+    return io.TextIOWrapper(io.BytesIO(data))
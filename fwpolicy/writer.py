@@ -0,0 +1,228 @@
+# Written by Viet Le
+# Feel free to use for all purposes
+
+# Output side of the exporter: the column registry and the writers of the policy rows.
+#   csv      the layout of the earlier versions, ',' after every field and '\,' inside values. The escape
+#            character is escaped too, a '\' inside a value is written '\\' (e.g. a\b gives a\\b)
+#   excel    standard quoted csv that spreadsheets and data tools load as is
+#   parquet  columnar file of string columns, written in record batches (needs pyarrow)
+#   arrow    Arrow IPC file, same batches as parquet (needs pyarrow)
+# A csv output whose name ends with .gz or .zst is compressed while it is written (.zst needs zstandard).
+# Rows are streamed to the output, the writers only hold one row or one record batch.
+
+import csv
+import importlib
+
+OUTPUT_FORMATS = ('csv', 'excel', 'parquet', 'arrow')
+FORMAT_SUFFIXES = {'csv': '.csv', 'excel': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+OPTIONAL_MODULES = {'parquet': 'pyarrow.parquet', 'arrow': 'pyarrow', '.zst': 'zstandard'}
+
+OUTPUT_BUFFER = 1 << 20     # bytes buffered before each write to the output file
+BATCH_ROWS = 65536  # rows of each parquet/arrow record batch
+
+
+class ColumnRegistry:
+    """ Column names and their position in the row. Columns keep the order they were added in.
+    """
+    __slots__ = ('names', 'slots')
+
+    def __init__(self, names=()):
+        self.names = []     # column names in output order
+        self.slots = dict()     # column name to position in the row
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> int:
+        """ Register the column if it is new.
+        Returns:
+            slot (int): position of the column in the row.
+        """
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.names)
+            self.names.append(name)
+        return slot
+
+    def index(self, name: str) -> int:
+        return self.slots[name]
+
+    def __contains__(self, name):
+        return name in self.slots
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class ExportDialect(csv.Dialect):
+    """ Same layout as the hand written csv of the earlier versions: no quoting, every field followed by ','.
+        A ',' inside a value is escaped as '\\,' so it can not shift the following fields, and a '\\' as '\\\\'
+        so the escapes can be read back (csv.reader with this dialect gives the values as they were).
+    """
+    delimiter = ','
+    quotechar = None
+    escapechar = '\\'
+    doublequote = False
+    skipinitialspace = False
+    lineterminator = '\n'
+    quoting = csv.QUOTE_NONE
+
+
+def _import_optional(module: str):
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        package = module.split('.')[0]
+        raise ImportError('{} is not installed, run: pip install {}'.format(package, package))
+
+
+def check_output(output_file: str, output_format: str = 'csv'):
+    """ Import the optional module the output needs, raises ImportError when it is not installed.
+    """
+    if output_format in OPTIONAL_MODULES:
+        _import_optional(OPTIONAL_MODULES[output_format])
+    elif output_file.endswith('.zst'):
+        _import_optional(OPTIONAL_MODULES['.zst'])
+
+
+def open_text(output_file: str, newline: str = None):
+    """ Open a text output file, compressed with gzip or zstd when its name ends with .gz or .zst.
+    """
+    if output_file.endswith('.gz'):
+        import gzip
+        return gzip.open(output_file, 'wt', newline=newline)
+    if output_file.endswith('.zst'):
+        return _import_optional('zstandard').open(output_file, 'wt', newline=newline)
+    return open(output_file, 'w', buffering=OUTPUT_BUFFER, newline=newline)
+
+
+class PolicyWriter:
+    """ Writes one row per policy with a single writerow call.
+        The row buffer is allocated once and refilled for each policy.
+    """
+
+    def __init__(self, out_file, columns: ColumnRegistry, blank: str = ' ', dialect=ExportDialect):
+        """
+        Parameters:
+            out_file: opened output file, closed by close().
+            columns (ColumnRegistry): final column list of the export.
+            blank (str): value of the columns a policy does not set.
+            dialect: ExportDialect for the layout of the earlier versions, csv.excel for standard csv.
+        """
+        self.out_file = out_file
+        self.writer = csv.writer(out_file, dialect=dialect)
+        self.columns = columns
+        self.legacy = dialect is ExportDialect
+        # the extra empty field keeps the ',' at the end of each line
+        self.blank = [blank] * len(columns) + ([''] if self.legacy else [])
+        self.row = list(self.blank)
+
+    def write_header(self):
+        self.writer.writerow(self.columns.names + ([''] if self.legacy else []))
+
+    def write(self, record: dict):
+        """ Write one policy.
+        Parameters:
+            record (dict): column name to value, names that are not a column are left out.
+        """
+        row = self.row
+        row[:] = self.blank
+        slots = self.columns.slots
+        if self.legacy:
+            for name, value in record.items():
+                slot = slots.get(name)
+                if slot is not None:
+                    row[slot] = value
+        else:   # without the space the earlier versions add after the values
+            for name, value in record.items():
+                slot = slots.get(name)
+                if slot is not None:
+                    row[slot] = value.rstrip(' ')
+        self.writer.writerow(row)
+
+    def close(self):
+        self.out_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ArrowPolicyWriter:
+    """ Writes the policies to a Parquet or Arrow IPC file, every column is a string column.
+        Rows are collected column by column and written as one record batch every batch_rows rows.
+    """
+
+    def __init__(self, output_file: str, columns: ColumnRegistry, output_format: str = 'parquet',
+                 batch_rows: int = BATCH_ROWS):
+        pyarrow = self.pyarrow = _import_optional('pyarrow')
+        self.schema = pyarrow.schema([(name, pyarrow.string()) for name in columns.names])
+        if output_format == 'parquet':
+            parquet = _import_optional('pyarrow.parquet')
+            self.sink = parquet.ParquetWriter(output_file, self.schema, compression='zstd')
+        else:
+            self.sink = pyarrow.ipc.new_file(output_file, self.schema)
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self.buffers = [[] for name in columns.names]
+        self.row = [None] * len(columns)
+
+    def write_header(self):
+        pass    # the column names are in the schema
+
+    def write(self, record: dict):
+        """ Add one policy to the batch, columns the policy does not set are null.
+        """
+        row = self.row
+        row[:] = [None] * len(row)
+        slots = self.columns.slots
+        for name, value in record.items():
+            slot = slots.get(name)
+            if slot is not None:
+                row[slot] = value.rstrip(' ')
+        for buffer, value in zip(self.buffers, row):
+            buffer.append(value)
+        if len(self.buffers[0]) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """ Write the collected rows as one record batch.
+        """
+        if self.buffers and self.buffers[0]:
+            pyarrow = self.pyarrow
+            batch = pyarrow.record_batch([pyarrow.array(buffer, pyarrow.string()) for buffer in self.buffers],
+                                         schema=self.schema)
+            self.sink.write_batch(batch)
+            for buffer in self.buffers:
+                buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_writer(output_file: str, columns: ColumnRegistry, blank: str = ' ', output_format: str = 'csv'):
+    """ Open the output file and the writer of its format.
+    Parameters:
+        output_file (str): output file, a csv output ending with .gz or .zst is compressed.
+        columns (ColumnRegistry): final column list of the export.
+        blank (str): value of the columns a policy does not set, in the csv layout of the earlier versions.
+        output_format (str): one of OUTPUT_FORMATS.
+    Returns:
+        writer (PolicyWriter or ArrowPolicyWriter): writer with write_header(), write(record) and close().
+    """
+    if output_format == 'parquet' or output_format == 'arrow':
+        return ArrowPolicyWriter(output_file, columns, output_format)
+    if output_format == 'excel':
+        return PolicyWriter(open_text(output_file, newline=''), columns, '', csv.excel)
+    return PolicyWriter(open_text(output_file), columns, blank)